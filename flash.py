@@ -1,13 +1,27 @@
-from typing import Optional, List
+from typing import Iterator, Optional, List, Tuple
+import atexit
+import collections
+import functools
+import hashlib
+import io
 import json
 import logging
 import logging.handlers
+import mmap
 import os
 import platform
+import queue
+import re
+import selectors
 import shutil
+import socket
+import struct
 import subprocess
 import threading
+import time
 import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from pathlib import Path
 from PyQt6 import QtWidgets, QtGui
 from PyQt6.QtWidgets import (
@@ -23,14 +37,48 @@ from PyQt6.QtWidgets import (
     QTabWidget,
     QHBoxLayout,
 )
-import webbrowser
-from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtCore import (
+    Qt,
+    QObject,
+    QThread,
+    QTimer,
+    QThreadPool,
+    pyqtSignal,
+    pyqtSlot,
+)
 
 import sys
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up; the stdlib parser is used otherwise.
+    orjson = None
+try:
+    import pyudev
+except ImportError:  # Optional; without it the device poll runs more often.
+    pyudev = None
 
 CONFIG_FILE = 'device_config.json'
+# Built-in profiles; device_config.json only needs the keys it overrides.
+# Optional 'recovery_sha256' and 'rom_sha256' keys pin the expected files.
+DEFAULT_PROFILES = {
+    'SM-J320FN': {
+        'device': 'j3lte',
+        'recovery_url': 'https://eu.dl.twrp.me/j3lte/twrp-3.7.0_9-0-j3lte.img',
+        'rom_url': (
+            'https://download.lineage.microg.org/j3xnlte/'
+            'lineage-18.1-20230419-microG-j3xnlte.zip'
+        ),
+        'magisk_url': (
+            'https://github.com/topjohnwu/Magisk/releases/latest/download/'
+            'Magisk-v26.4.apk'
+        ),
+    },
+}
 CACHE_DIR = Path('cache')
 LOG_FILE = 'flasher.log'
 ROOT_LOG_FILE = 'root.log'
@@ -42,6 +90,49 @@ MAGISK_URL = (
 )
 MAGISK_ZIP = DOWNLOADS_DIR / 'Magisk-v23.0.zip'
 TRAVELBOT_APK = Path('travelbot.apk')
+TOOLS_MARKER = Path('.tools_ok')
+# Members of the platform-tools archive the flasher needs (plus the licence).
+PLATFORM_TOOLS_FILES = frozenset({
+    'platform-tools/adb',
+    'platform-tools/adb.exe',
+    'platform-tools/AdbWinApi.dll',
+    'platform-tools/AdbWinUsbApi.dll',
+    'platform-tools/libwinpthread-1.dll',
+    'platform-tools/fastboot',
+    'platform-tools/fastboot.exe',
+    'platform-tools/NOTICE.txt',
+})
+DOWNLOAD_WORKERS = 5
+# Size of the byte ranges the download workers pull from a shared queue.
+DOWNLOAD_PART_SIZE = 8 * 1024 * 1024
+DEFAULT_DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+
+def _download_chunk_size() -> int:
+    """Return FLASHER_DOWNLOAD_CHUNK_SIZE if it is a positive byte count."""
+    raw = os.environ.get('FLASHER_DOWNLOAD_CHUNK_SIZE')
+    if raw is None:
+        return DEFAULT_DOWNLOAD_CHUNK_SIZE
+    try:
+        size = int(raw)
+    except ValueError:
+        size = 0
+    if size > 0:
+        return size
+    # A zero-byte read would end the copy at once and "complete" an empty file.
+    logging.warning(
+        'Ignoring FLASHER_DOWNLOAD_CHUNK_SIZE=%r, using %d bytes',
+        raw,
+        DEFAULT_DOWNLOAD_CHUNK_SIZE,
+    )
+    return DEFAULT_DOWNLOAD_CHUNK_SIZE
+
+
+# Block size for streaming downloads; large blocks keep the copy loop cheap.
+# FLASHER_DOWNLOAD_CHUNK_SIZE (bytes) overrides it for slow or small devices.
+DOWNLOAD_CHUNK_SIZE = _download_chunk_size()
+# (connect, read) timeouts in seconds so a stalled server can't hang a job.
+HTTP_TIMEOUT = (5, 30)
 
 # Version information
 __version__ = "1.0.0"
@@ -62,10 +153,68 @@ INSTRUCTION_TEXT = (
 IS_WINDOWS = platform.system().lower() == 'windows'
 ADB_NAME = 'adb.exe' if IS_WINDOWS else 'adb'
 HEIMDALL_NAME = 'heimdall.exe' if IS_WINDOWS else 'heimdall'
+# adb from the platform-tools download, used when none is on PATH.
+LOCAL_ADB = Path('platform-tools') / ADB_NAME
+PLATFORM_TOOLS_URL = (
+    'https://dl.google.com/android/repository/platform-tools-latest-'
+    f"{'windows' if IS_WINDOWS else 'linux'}.zip"
+)
+# Seconds a startup connection warm-up may take before it is given up.
+WARM_UP_TIMEOUT = 3
+# Seconds a device query over the adb shell session may take.
+ADB_SHELL_TIMEOUT = 30
+# Device poll interval in ms; USB hotplug events make it a safety net only.
+POLL_INTERVAL = 3000
+EVENT_POLL_INTERVAL = 30000
+WM_DEVICECHANGE = 0x0219
+# Vendor part of the kernel's PRODUCT uevent key ("4e8/6860/400") for Samsung.
+SAMSUNG_USB_VENDOR = '4e8'
+# Streamed tool output reaches the log box at most this often (seconds).
+LOG_FLUSH_INTERVAL = 0.05
+
+
+def _create_session() -> requests.Session:
+    """Create the HTTP session shared by all downloads.
+
+    Reusing it keeps connections (and their TLS sessions) alive between
+    downloads, and the pool is large enough for two parallel downloads.
+    """
+    session = requests.Session()
+    session.headers['User-Agent'] = f'j3-flasher/{__version__}'
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=DOWNLOAD_WORKERS * 2,
+        max_retries=Retry(total=3, backoff_factor=0.3,
+                          status_forcelist=[500, 502, 503, 504]),
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+_SESSION = _create_session()
+
+
+def warm_connections():
+    """Open pooled connections to the download hosts ahead of the first job.
+
+    Run in the background at startup: the DNS lookup and TLS handshake happen
+    while the user reads the instructions, and the first download reuses the
+    connection. Failures are ignored; the download itself will report them.
+    """
+    for url in (PLATFORM_TOOLS_URL, TWRP_URL, MAGISK_URL):
+        try:
+            _SESSION.head(url, timeout=WARM_UP_TIMEOUT).close()
+        except requests.RequestException:
+            pass
 
 # Configure logging with rotation
 def setup_logging():
-    """Set up logging with rotation and proper formatting."""
+    """Set up logging with rotation and proper formatting.
+
+    Records are handed to a queue and written by a background listener, so
+    logging from the flashing thread never waits on the disk.
+    """
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
     
@@ -75,7 +224,7 @@ def setup_logging():
     
     # Create rotating file handler (5MB max, keep 3 backup files)
     handler = logging.handlers.RotatingFileHandler(
-        LOG_FILE, maxBytes=5*1024*1024, backupCount=3
+        LOG_FILE, maxBytes=5*1024*1024, backupCount=3, delay=True
     )
     handler.setLevel(logging.INFO)
     
@@ -86,28 +235,117 @@ def setup_logging():
     )
     handler.setFormatter(formatter)
     
-    logger.addHandler(handler)
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
 
 # Initialize logging
 setup_logging()
 
 
+class _GuiCall(QObject):
+    """Runs callables on the GUI thread on behalf of the job threads.
+
+    Widgets and dialogs may only be touched from the GUI thread; the
+    blocking connection makes the caller wait for the result.
+    """
+
+    call = pyqtSignal(object)
+
+    def __init__(self):
+        super().__init__()
+        self.call.connect(self._run, Qt.ConnectionType.BlockingQueuedConnection)
+
+    @pyqtSlot(object)
+    def _run(self, box):
+        # A call queued just before shutdown gets no dialog either.
+        if not SHUTTING_DOWN.is_set():
+            box[1] = box[0]()
+
+
+# Created by main() once the QApplication exists.
+_GUI_CALL = None
+# Set while the application quits; jobs then get no dialogs.
+SHUTTING_DOWN = threading.Event()
+
+
+class JobCancelled(BaseException):
+    """Raised in a job that reaches the GUI while the application quits.
+
+    Like ``KeyboardInterrupt`` it is not an ``Exception``, so the jobs'
+    error handlers let it through and the job stops where it is instead of
+    carrying on past a confirmation nobody saw.
+    """
+
+
+def _on_gui_thread(fn):
+    """Return ``fn()``, run on the GUI thread when called from another one.
+
+    Raises ``JobCancelled`` for job threads once the application is shutting
+    down, as the GUI thread no longer serves them.
+    """
+    if _GUI_CALL is None or threading.current_thread() is threading.main_thread():
+        return fn()
+    if SHUTTING_DOWN.is_set():
+        raise JobCancelled
+    box = [fn, None]
+    _GUI_CALL.call.emit(box)
+    if SHUTTING_DOWN.is_set():
+        raise JobCancelled
+    return box[1]
+
+
+# One dialog per icon, built on first use and reused for later messages.
+_MESSAGE_BOXES = {}
+
+
+def _message_box(icon, title, message, buttons=None):
+    """Show ``message`` in the reused dialog for ``icon``; return the button.
+
+    A dialog that is still open is left alone and a new one is built, as
+    exec() on a visible box returns at once instead of waiting.
+    """
+    box = _MESSAGE_BOXES.get(icon)
+    if box is None or box.isVisible():
+        box = QMessageBox()
+        box.setIcon(icon)
+        _MESSAGE_BOXES.setdefault(icon, box)
+    box.setWindowTitle(title)
+    box.setText(message)
+    box.setStandardButtons(buttons or QMessageBox.StandardButton.Ok)
+    box.exec()
+    return box.standardButton(box.clickedButton())
+
+
 def show_info(title, message):
-    QMessageBox.information(None, title, message)
+    _on_gui_thread(
+        lambda: _message_box(QMessageBox.Icon.Information, title, message)
+    )
 
 
 def show_error(title, message):
-    QMessageBox.critical(None, title, message)
+    _on_gui_thread(lambda: _message_box(QMessageBox.Icon.Critical, title, message))
 
 
 def ask_yes_no(title, message):
-    return QMessageBox.question(None, title, message, QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No) == QMessageBox.StandardButton.Yes
+    buttons = QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+    answer = _on_gui_thread(
+        lambda: _message_box(QMessageBox.Icon.Question, title, message, buttons)
+    )
+    return answer == QMessageBox.StandardButton.Yes
+
+
+# Echo to the console only when there is one and no log box shows the text.
+_HAS_TTY = sys.stdout is not None and sys.stdout.isatty()
 
 
 def log(message, text_widget=None):
     """Log a message to the log file and optionally to the GUI log box."""
     logging.info(message)
-    print(message)
+    if _HAS_TTY and not text_widget:
+        print(message)
     if text_widget:
         text_widget.append(message)
 
@@ -116,53 +354,474 @@ def root_log(message, text_widget=None):
     """Write a log line to root.log and optionally to the GUI."""
     with open(ROOT_LOG_FILE, 'a') as fh:
         fh.write(message + "\n")
-    print(message)
+    if _HAS_TTY and not text_widget:
+        print(message)
     if text_widget:
         text_widget.append(message)
 
 
+@functools.lru_cache(maxsize=None)
 def check_tool(name: str) -> Optional[str]:
-    """Check if a tool is available in the system PATH."""
+    """Check if a tool is available in the system PATH.
+
+    The answer is cached; call ``check_tool.cache_clear()`` after installing
+    something so the next lookup walks PATH again.
+    """
     return shutil.which(name)
 
 
+def _advise_sequential(fh):
+    """Tell the kernel ``fh`` is accessed front to back (no-op without fadvise)."""
+    if hasattr(os, 'posix_fadvise'):
+        os.posix_fadvise(fh.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+
+def _advise_file(path, advice_name):
+    """Apply ``os.<advice_name>`` to the whole of ``path`` where fadvise exists."""
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, getattr(os, advice_name))
+    finally:
+        os.close(fd)
+
+
+def _drop_page_cache(path):
+    """Ask the kernel to evict ``path`` from the page cache once it's on disk.
+
+    Downloads are read once by heimdall or adb and would otherwise push other
+    programs' pages out. DONTNEED starts writeback and drops what is clean.
+    """
+    _advise_file(path, 'POSIX_FADV_DONTNEED')
+
+
+def _prefetch(path):
+    """Start reading ``path`` into the page cache before it is sent somewhere."""
+    _advise_file(path, 'POSIX_FADV_WILLNEED')
+
+
+def _preallocate(fh, size):
+    """Reserve ``size`` bytes for ``fh`` so the file is laid out in one go."""
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fh.fileno(), 0, size)
+            return
+        except OSError:
+            pass  # Filesystem without fallocate support.
+    fh.truncate(size)
+
+
+def _download_stream(url, dest, hasher=None, cancel=None):
+    """Download ``url`` to ``dest`` over a single HTTP stream.
+
+    When ``hasher`` is given it is fed every block as it is written. Setting
+    the ``cancel`` event stops the download at the next block.
+    """
+    with _SESSION.get(url, stream=True, timeout=HTTP_TIMEOUT) as resp:
+        if resp.status_code != 200:
+            raise RuntimeError(f'Failed to download {url}')
+        resp.raw.decode_content = True
+        size = int(resp.headers.get('Content-Length', 0))
+        # Decoded reads can come back short; the buffer still writes 1 MiB.
+        with open(dest, 'wb', buffering=DOWNLOAD_CHUNK_SIZE) as fh:
+            if size:
+                _preallocate(fh, size)
+            _advise_sequential(fh)
+            if hasher is None:
+                shutil.copyfileobj(resp.raw, fh, length=DOWNLOAD_CHUNK_SIZE)
+            else:
+                # Hash each block while it is still in cache instead of
+                # re-reading the file afterwards.
+                for block in iter(lambda: resp.raw.read(DOWNLOAD_CHUNK_SIZE), b''):
+                    if cancel is not None and cancel.is_set():
+                        raise RuntimeError(f'Download of {url} cancelled')
+                    hasher.update(block)
+                    fh.write(block)
+            # Content-Length counts encoded bytes, so drop any unused reservation.
+            fh.truncate()
+
+
+def _hash_file(path, hasher):
+    """Feed the contents of ``path`` to ``hasher`` through a read-only mmap.
+
+    The hasher reads straight from the page cache, without copying the file
+    through Python buffers.
+    """
+    with open(path, 'rb') as fh:
+        if not os.fstat(fh.fileno()).st_size:
+            return  # empty files can't be mapped
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            hasher.update(mm)
+
+
+class _RangesIgnored(RuntimeError):
+    """Raised when a server answers a range request with the whole file."""
+
+
+def _download_range(url, part, start, end, validator=None):
+    """Write bytes ``start`` up to ``end`` of ``url`` at the same offset of ``part``.
+
+    With a ``validator`` (ETag or Last-Modified) the server sends the whole
+    file instead of the range if it changed, which raises ``_RangesIgnored``.
+    """
+    headers = {'Range': f'bytes={start}-{end - 1}', 'Accept-Encoding': 'identity'}
+    if validator:
+        headers['If-Range'] = validator
+    with _SESSION.get(
+        url, headers=headers, stream=True, timeout=HTTP_TIMEOUT
+    ) as resp:
+        if resp.status_code == 200:
+            raise _RangesIgnored(f'{url} does not honour range requests')
+        if resp.status_code != 206:
+            raise RuntimeError(f'Range request for {url} failed ({resp.status_code})')
+        content_range = resp.headers.get('Content-Range')
+        if content_range and not content_range.startswith(f'bytes {start}-{end - 1}/'):
+            raise RuntimeError(
+                f'Asked {url} for bytes {start}-{end - 1}, got {content_range}')
+        # Every worker writes through its own handle, so seeking is positional I/O.
+        with open(part, 'r+b', buffering=DOWNLOAD_CHUNK_SIZE) as fh:
+            fh.seek(start)
+            shutil.copyfileobj(resp.raw, fh, length=DOWNLOAD_CHUNK_SIZE)
+            received = fh.tell() - start
+        # A short body would leave part of the preallocated hole in the file.
+        if received != end - start:
+            raise RuntimeError(
+                f'Range {start}-{end - 1} of {url} ended after {received} of '
+                f'{end - start} bytes')
+
+
+def parallel_download(url, dest, text=None, workers=DOWNLOAD_WORKERS,
+                      part_size=DOWNLOAD_PART_SIZE, head=None, expected_sha256=None,
+                      cancel=None):
+    """Download ``url`` to ``dest`` with ``workers`` parallel range requests.
+
+    The file is split into ``part_size`` ranges that the workers take from a
+    shared queue, so a fast connection picks up more of the work. Falls back
+    to a single stream when the server does not report a size or does not
+    honour byte ranges. Data is written to ``<dest>.part`` and only moved to
+    ``dest`` once the whole file has arrived; a shorter ``.part`` left by an
+    interrupted run is resumed from where it stopped. ``head`` may be a
+    response to an earlier HEAD request for ``url``. When
+    ``expected_sha256`` is given a mismatching file is discarded and
+    ``RuntimeError`` is raised. The file's SHA-256 and remote version are
+    recorded next to ``dest`` so later runs can trust the cached copy.
+    Setting the ``cancel`` event makes the download raise ``RuntimeError``
+    once the ranges already in flight have arrived.
+    """
+    dest = Path(dest)
+    part = dest.with_name(dest.name + '.part')
+    hasher = hashlib.sha256()
+    if head is None:
+        head = _SESSION.head(url, allow_redirects=True, timeout=HTTP_TIMEOUT)
+    size = int(head.headers.get('Content-Length', 0))
+    ranged = head.headers.get('Accept-Ranges', '').lower() == 'bytes'
+    if head.status_code != 200 or not ranged or not size:
+        _download_stream(url, part, hasher, cancel)
+    else:
+        try:
+            # Use the post-redirect URL so the workers skip the redirect hop.
+            _download_ranges(head.url, part, size, workers, part_size, text,
+                             _range_validator(head), cancel)
+        except _RangesIgnored:
+            log('Server sent the whole file, using a single stream', text)
+            _download_stream(url, part, hasher, cancel)
+        else:
+            # Parts arrive out of order, so hash the assembled file once.
+            _hash_file(part, hasher)
+    digest = hasher.hexdigest()
+    if expected_sha256 and digest != expected_sha256.lower():
+        part.unlink()
+        raise RuntimeError(f'Checksum mismatch for {dest.name}')
+    os.replace(part, dest)
+    _validator_file(part).unlink(missing_ok=True)
+    _write_checksum(dest, digest)
+    validator = _range_validator(head) if head.status_code == 200 else None
+    if validator:
+        _validator_file(dest).write_text(validator)
+    else:
+        _validator_file(dest).unlink(missing_ok=True)
+    _drop_page_cache(dest)
+
+
+def _range_validator(head) -> Optional[str]:
+    """Return the value to send as ``If-Range`` for the resource in ``head``."""
+    etag = head.headers.get('ETag', '')
+    # Weak ETags can't be used with If-Range; Last-Modified still can.
+    if etag and not etag.startswith('W/'):
+        return etag
+    return head.headers.get('Last-Modified')
+
+
+def _validator_file(part: Path) -> Path:
+    """Return the sidecar that records which remote version ``part`` holds."""
+    return part.with_name(part.name + '.etag')
+
+
+def _checksum_file(dest: Path) -> Path:
+    """Return the sidecar holding the SHA-256 of a completed download."""
+    return dest.with_name(dest.name + '.sha256')
+
+
+def _write_checksum(dest: Path, digest: str):
+    """Record ``digest`` together with the size and mtime it was taken at."""
+    st = dest.stat()
+    _checksum_file(dest).write_text(f'{digest} {st.st_size} {st.st_mtime_ns}\n')
+
+
+def _read_sidecar(path: Path) -> Optional[str]:
+    try:
+        return path.read_text().strip() or None
+    except OSError:
+        return None
+
+
+def _file_sha256(path) -> str:
+    """Return the hex SHA-256 of the file at ``path``."""
+    hasher = hashlib.sha256()
+    _hash_file(path, hasher)
+    return hasher.hexdigest()
+
+
+def _cache_ok(dest: Path, expected_sha256: Optional[str] = None) -> bool:
+    """Return whether ``dest`` still matches the checksum recorded for it.
+
+    The file is only hashed again when its size or mtime differs from the
+    ones stored with the checksum, so an untouched ROM isn't re-read on
+    every run.
+    """
+    fields = (_read_sidecar(_checksum_file(dest)) or '').split()
+    try:
+        st = dest.stat()
+    except OSError:
+        return False
+    if not fields:
+        return False
+    recorded = fields[0]
+    if expected_sha256 and recorded != expected_sha256.lower():
+        return False
+    if fields[1:] == [str(st.st_size), str(st.st_mtime_ns)]:
+        return True
+    if _file_sha256(dest) != recorded:
+        return False
+    _write_checksum(dest, recorded)
+    return True
+
+
+def _download_ranges(url, part, size, workers, part_size, text=None, validator=None,
+                     cancel=None):
+    """Fill ``part`` up to ``size`` bytes using ``workers`` range-request threads.
+
+    Once ``cancel`` is set the workers take no new ranges.
+    """
+    # A full-size .part was preallocated by a run that never finished.
+    offset = part.stat().st_size if part.exists() else 0
+    if offset >= size:
+        offset = 0
+    sidecar = _validator_file(part)
+    if offset and validator:
+        if _read_sidecar(sidecar) != validator:
+            log('Remote file changed since the last attempt, starting over', text)
+            offset = 0
+            os.truncate(part, 0)
+    if offset:
+        log(f'Resuming download at {offset} of {size} bytes', text)
+    if validator:
+        sidecar.write_text(validator)
+    with open(part, 'ab') as fh:
+        _preallocate(fh, size)
+    pieces = queue.Queue()
+    for start in range(offset, size, part_size):
+        pieces.put((start, min(start + part_size, size)))
+    workers = min(workers, pieces.qsize())
+    log(f'Downloading with {workers} parallel connections', text)
+    done = set()
+    failed = threading.Event()
+
+    def worker():
+        while not failed.is_set():
+            try:
+                start, end = pieces.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                if cancel is not None and cancel.is_set():
+                    raise RuntimeError(f'Download of {url} cancelled')
+                _download_range(url, part, start, end, validator)
+            except BaseException:
+                failed.set()
+                raise
+            done.add(start)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(worker) for _ in range(workers)]:
+                future.result()
+    finally:
+        completed = offset
+        while completed < size and completed in done:
+            completed = min(completed + part_size, size)
+        if completed < size:
+            # Keep only the contiguous head so the next run can resume it.
+            os.truncate(part, completed)
+
+
+def _extract_member(zip_ref, info):
+    """Copy one archive member to the path it names, relative to the cwd."""
+    if info.is_dir():
+        return
+    with zip_ref.open(info) as src, open(info.filename, 'wb') as dst:
+        shutil.copyfileobj(src, dst, length=DOWNLOAD_CHUNK_SIZE)
+
+
 def download_platform_tools(text):
-    system = 'windows' if IS_WINDOWS else 'linux'
-    url = f'https://dl.google.com/android/repository/platform-tools-latest-{system}.zip'
+    url = PLATFORM_TOOLS_URL
     log(f'Downloading platform tools from {url}', text)
-    resp = requests.get(url, stream=True)
-    if resp.status_code != 200:
-        raise RuntimeError('Failed to download platform tools')
-    zpath = Path('platform-tools.zip')
-    with open(zpath, 'wb') as fh:
-        for chunk in resp.iter_content(chunk_size=8192):
-            fh.write(chunk)
+    # The archive is small, so keep it in memory instead of writing,
+    # re-reading and deleting a temporary zip file.
+    buf = io.BytesIO()
+    with _SESSION.get(url, stream=True, timeout=HTTP_TIMEOUT) as resp:
+        if resp.status_code != 200:
+            raise RuntimeError('Failed to download platform tools')
+        resp.raw.decode_content = True
+        shutil.copyfileobj(resp.raw, buf, length=DOWNLOAD_CHUNK_SIZE)
+    buf.seek(0)
     log('Extracting platform tools...', text)
-    with zipfile.ZipFile(zpath, 'r') as zip_ref:
-        zip_ref.extractall('.')
-    zpath.unlink()
+    with zipfile.ZipFile(buf, 'r') as zip_ref:
+        # Skip systrace, docs and the other host tools the flasher never runs.
+        members = [
+            info for info in zip_ref.infolist()
+            if info.filename in PLATFORM_TOOLS_FILES
+            or info.filename.startswith('platform-tools/lib64/')
+        ]
+        # Create the directories first so the workers don't race on makedirs.
+        for folder in {Path(info.filename).parent for info in members}:
+            folder.mkdir(parents=True, exist_ok=True)
+        # zlib releases the GIL while inflating, so members extract in parallel.
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            list(pool.map(lambda info: _extract_member(zip_ref, info), members))
     if not IS_WINDOWS:
-        os.chmod('platform-tools/adb', 0o755)
+        for tool in ('adb', 'fastboot'):
+            binary = Path('platform-tools') / tool
+            if binary.exists():
+                os.chmod(binary, 0o755)
     log('Platform tools ready.', text)
 
 
+@dataclass
+class ToolState:
+    """Tool paths and the heimdall version, resolved once per session."""
+
+    adb_path: Optional[str] = None
+    heimdall_path: Optional[str] = None
+    heimdall_version: Optional[str] = None
+
+    def clear(self):
+        """Forget everything so the next check looks the tools up again."""
+        self.adb_path = self.heimdall_path = self.heimdall_version = None
+
+
+# Filled by ensure_adb/ensure_heimdall/check_heimdall and probe_tools().
+TOOLS = ToolState()
+# Held while a tool is looked up or installed, so a job and the startup probe
+# never download platform-tools or run apt at the same time.
+_TOOL_LOCK = threading.Lock()
+
+
+def _read_tools_marker() -> dict:
+    """Return the tool paths recorded by an earlier successful check."""
+    try:
+        tools = json.loads(TOOLS_MARKER.read_text())
+    except (OSError, ValueError):
+        return {}
+    return tools if isinstance(tools, dict) else {}
+
+
+def _cached_tool(name: str) -> Optional[str]:
+    """Return the recorded path for ``name`` if that binary still exists."""
+    path = _read_tools_marker().get(name)
+    return path if path and Path(path).exists() else None
+
+
+def _record_tool(name: str, path: str):
+    """Remember ``path`` for ``name`` so later runs can skip the lookup."""
+    tools = _read_tools_marker()
+    tools[name] = path
+    TOOLS_MARKER.write_text(json.dumps(tools))
+
+
+def probe_tools():
+    """Resolve the tools and heimdall's version without installing anything.
+
+    Run in the background at startup so the first click finds them cached.
+    """
+    with _TOOL_LOCK:
+        if not TOOLS.adb_path:
+            TOOLS.adb_path = (
+                _cached_tool('adb')
+                or check_tool(ADB_NAME)
+                or (str(LOCAL_ADB) if LOCAL_ADB.exists() else None)
+            )
+        if not TOOLS.heimdall_path:
+            TOOLS.heimdall_path = (
+                _cached_tool('heimdall') or check_tool(HEIMDALL_NAME)
+            )
+    if TOOLS.heimdall_path and not TOOLS.heimdall_version:
+        try:
+            result = subprocess.run(
+                [TOOLS.heimdall_path, 'version'], capture_output=True, text=True
+            )
+        except OSError:
+            return
+        if result.returncode == 0:
+            TOOLS.heimdall_version = result.stdout.strip()
+
+
 def ensure_adb(text):
-    adb = check_tool(ADB_NAME)
-    if adb:
-        log('ADB found on system.', text)
-        return
-    local_adb = Path('platform-tools') / ADB_NAME
-    if local_adb.exists():
-        log('Using local platform-tools binaries.', text)
+    if TOOLS.adb_path:
         return
-    log('ADB not found, downloading platform tools...', text)
-    download_platform_tools(text)
+    with _TOOL_LOCK:
+        # Another job or the startup probe may have finished while we waited.
+        if TOOLS.adb_path:
+            return
+        cached = _cached_tool('adb')
+        if cached:
+            TOOLS.adb_path = cached
+            log(f'Using ADB at {cached}.', text)
+            return
+        adb = check_tool(ADB_NAME)
+        if adb:
+            log('ADB found on system.', text)
+        elif LOCAL_ADB.exists():
+            log('Using local platform-tools binaries.', text)
+        else:
+            log('ADB not found, downloading platform tools...', text)
+            download_platform_tools(text)
+        # Resolve once so adb_command doesn't walk PATH on every call.
+        TOOLS.adb_path = adb or str(LOCAL_ADB)
+        _record_tool('adb', TOOLS.adb_path)
 
 
 def ensure_heimdall(text):
-    if check_tool(HEIMDALL_NAME):
+    if TOOLS.heimdall_path:
+        log('Heimdall found.', text)
+        return True
+    with _TOOL_LOCK:
+        return _ensure_heimdall_locked(text)
+
+
+def _ensure_heimdall_locked(text):
+    heimdall = TOOLS.heimdall_path or _cached_tool('heimdall')
+    if heimdall:
+        TOOLS.heimdall_path = heimdall
         log('Heimdall found.', text)
         return True
+    heimdall = check_tool(HEIMDALL_NAME)
+    if heimdall:
+        log('Heimdall found.', text)
+        TOOLS.heimdall_path = heimdall
+        _record_tool('heimdall', heimdall)
+        return True
     log('Heimdall not found.', text)
     if not IS_WINDOWS:
         if ask_yes_no('Install Heimdall',
@@ -171,18 +830,35 @@ def ensure_heimdall(text):
                 subprocess.run(['sudo', 'apt', 'install', '-y', 'heimdall-flash'], check=False)
             except Exception as exc:  # noqa: BLE001
                 log(f'Failed to run apt: {exc}', text)
-    if check_tool(HEIMDALL_NAME):
+            check_tool.cache_clear()
+    heimdall = check_tool(HEIMDALL_NAME)
+    if heimdall:
         log('Heimdall installed.', text)
+        TOOLS.heimdall_path = heimdall
+        _record_tool('heimdall', heimdall)
         return True
     log('Please install Heimdall manually (or use Odin on Windows).', text)
     return False
 
 
+def _heimdall_executable() -> str:
+    return TOOLS.heimdall_path or HEIMDALL_NAME
+
+
 def check_heimdall(text_widget=None):
-    """Verify that Heimdall is installed by calling `heimdall version`."""
+    """Verify that Heimdall is installed by calling `heimdall version`.
+
+    The version is remembered in ``TOOLS``, so heimdall only runs once.
+    """
+    if TOOLS.heimdall_version:
+        log(TOOLS.heimdall_version, text_widget)
+        return True
     try:
         result = subprocess.run(
-            [HEIMDALL_NAME, 'version'], capture_output=True, text=True, check=False
+            [_heimdall_executable(), 'version'],
+            capture_output=True,
+            text=True,
+            check=False,
         )
     except FileNotFoundError:
         show_error(
@@ -198,7 +874,8 @@ def check_heimdall(text_widget=None):
         )
         log(result.stderr.strip(), text_widget)
         return False
-    log(result.stdout.strip(), text_widget)
+    TOOLS.heimdall_version = result.stdout.strip()
+    log(TOOLS.heimdall_version, text_widget)
     return True
 
 
@@ -206,7 +883,10 @@ def detect_device(text_widget=None):
     """Check if a device is in Download Mode via `heimdall detect`."""
     try:
         result = subprocess.run(
-            [HEIMDALL_NAME, 'detect'], capture_output=True, text=True, check=False
+            [_heimdall_executable(), 'detect'],
+            capture_output=True,
+            text=True,
+            check=False,
         )
     except FileNotFoundError:
         show_error(
@@ -228,43 +908,93 @@ def detect_device(text_widget=None):
 
 def download_twrp(text_widget=None):
     """Download the TWRP image if it's missing."""
-    if TWRP_IMG.exists():
+    if _cache_ok(TWRP_IMG):
         log(f'{TWRP_IMG} already present.', text_widget)
         return TWRP_IMG
     log(f'Downloading TWRP from {TWRP_URL}', text_widget)
-    response = requests.get(TWRP_URL, stream=True)
-    if response.status_code != 200:
-        raise RuntimeError('Failed to download TWRP image')
-    with open(TWRP_IMG, 'wb') as fh:
-        for chunk in response.iter_content(chunk_size=8192):
-            fh.write(chunk)
+    try:
+        parallel_download(TWRP_URL, TWRP_IMG, text_widget)
+    except RuntimeError as exc:
+        raise RuntimeError('Failed to download TWRP image') from exc
     log('TWRP download complete.', text_widget)
     return TWRP_IMG
 
 
+# Heimdall failures that usually mean a bad cable, a hub or ModemManager.
+HEIMDALL_USB_ERROR_RE = re.compile(
+    rb'protocol initialisation failed|failed to receive session end confirmation',
+    re.IGNORECASE,
+)
+
+
 def flash_recovery(img, text_widget=None):
     """Flash the recovery image using Heimdall and log the output."""
     log('⚡ Flashing TWRP...', text_widget)
-    cmd = [HEIMDALL_NAME, 'flash', '--RECOVERY', str(img), '--no-reboot']
-    output_lines = []
-    with open(LOG_FILE, 'a') as log_fh:
-        process = subprocess.Popen(
-            cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
-        )
-        for line in process.stdout:
-            line = line.strip()
-            output_lines.append(line)
-            log(line, text_widget)
-            log_fh.write(line + '\n')
+    cmd = [_heimdall_executable(), 'flash', '--RECOVERY', str(img), '--no-reboot']
+    output = bytearray()
+    pending = bytearray()
+    last_flush = time.monotonic()
+
+    def flush(data):
+        lines = (line.strip() for line in data.decode(errors='replace').splitlines())
+        chunk = '\n'.join(line for line in lines if line)
+        if not chunk:
+            return
+        if logging.getLogger().isEnabledFor(logging.INFO):
+            logging.info(chunk)
+        if _HAS_TTY and not text_widget:
+            print(chunk)
+        if text_widget:
+            text_widget.append(chunk)
+
+    process = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=0
+    )
+    if not text_widget and not _HAS_TTY:
+        # Nobody watches the progress, so collect it all and log it once.
+        output += process.communicate()[0]
+        flush(output)
+    else:
+        # Read whatever heimdall has written so far in one call and hand it
+        # on in batches, so hundreds of progress lines don't mean per-line work.
+        # On POSIX the wait has a timeout, so a batch still shows when heimdall
+        # goes quiet after writing it; Windows pipes can't be selected, so
+        # there every read is shown straight away.
+        fd = process.stdout.fileno()
+        selector = None if IS_WINDOWS else selectors.DefaultSelector()
+        if selector:
+            selector.register(fd, selectors.EVENT_READ)
+        interval = LOG_FLUSH_INTERVAL if selector else 0
+        try:
+            while True:
+                if selector is None or selector.select(LOG_FLUSH_INTERVAL):
+                    data = os.read(fd, 65536)
+                    if not data:
+                        break
+                    output += data
+                    pending += data
+                now = time.monotonic()
+                if now - last_flush >= interval:
+                    # heimdall redraws its progress with bare carriage returns.
+                    cut = max(pending.rfind(b'\n'), pending.rfind(b'\r')) + 1
+                    if cut:
+                        flush(pending[:cut])
+                        del pending[:cut]
+                        last_flush = now
+        finally:
+            if selector:
+                selector.close()
+        process.stdout.close()
         process.wait()
+        flush(pending)
+    logging.info(
+        'heimdall exited with %s after %d bytes', process.returncode, len(output)
+    )
 
-    output_text = '\n'.join(output_lines)
+    output_text = output.decode(errors='replace')
     if process.returncode != 0:
         error_text = output_text
-        if (
-            'protocol initialisation failed' in error_text.lower()
-            or 'failed to receive session end confirmation' in error_text.lower()
-        ):
+        if HEIMDALL_USB_ERROR_RE.search(output):
             error_text += (
                 '\n\nGebruik een originele USB-datakabel.\n'
                 'Vermijd USB-hubs, zet het toestel opnieuw in Download Mode\n'
@@ -273,7 +1003,7 @@ def flash_recovery(img, text_widget=None):
         show_error('Flash Failed', error_text)
         return False
 
-    if 'RECOVERY upload successful' not in output_text:
+    if b'RECOVERY upload successful' not in output:
         show_error('Flash Failed', output_text)
         return False
 
@@ -312,54 +1042,443 @@ def flash_twrp_gui(text_widget=None):
     flash_recovery(TWRP_IMG, text_widget)
 
 
-def adb_command(args: List[str]) -> subprocess.CompletedProcess:
-    """Execute an ADB command with the given arguments."""
-    adb_path = check_tool(ADB_NAME) or str(Path('platform-tools') / ADB_NAME)
-    return subprocess.run([adb_path] + args, capture_output=True, text=True)
+def _adb_executable() -> str:
+    """Return the adb binary resolved by ensure_adb, or look it up now."""
+    if not TOOLS.adb_path:
+        # Remember a PATH hit; the local fallback may not be downloaded yet.
+        TOOLS.adb_path = check_tool(ADB_NAME)
+    return TOOLS.adb_path or str(LOCAL_ADB)
+
+
+def adb_command(
+    args: List[str], text: bool = True, capture: bool = True
+) -> subprocess.CompletedProcess:
+    """Execute an ADB command with the given arguments.
+
+    Pass ``text=False`` to get raw bytes back when the caller only scans the
+    output and decoding it would be wasted work, and ``capture=False`` for
+    commands whose output is never read.
+    """
+    if not capture:
+        return subprocess.run(
+            [_adb_executable()] + args,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+    return subprocess.run([_adb_executable()] + args, capture_output=True, text=text)
+
+
+class AdbShell:
+    """Long-lived ``adb shell`` session for read-only device queries.
+
+    Commands are written to the shell's stdin and their output is framed by
+    marker lines, so each query is a round trip over the open connection
+    instead of a fresh adb process. State-changing verbs (reboot, sideload,
+    install, push) keep using :func:`adb_command`.
+    """
+
+    BEGIN = '__BEGIN__'
+    END_RE = re.compile(r'__END__(\d+)\s*$')
+
+    def __init__(self):
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        self._proc = subprocess.Popen(
+            [_adb_executable(), 'shell'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+        )
+
+    def run(self, command: str, timeout: float = ADB_SHELL_TIMEOUT) -> Tuple[str, int]:
+        """Run ``command`` on the device and return its output and exit code.
+
+        A command that hasn't finished after ``timeout`` seconds ends the
+        session and counts as failed (exit code 1).
+        """
+        with self._lock:
+            if self._proc is None or self._proc.poll() is not None:
+                self._start()
+            try:
+                self._proc.stdin.write(
+                    f'echo {self.BEGIN}; {{ {command}; }} 2>&1; echo __END__$?\n'
+                )
+                self._proc.stdin.flush()
+            except OSError:
+                self.close()
+                return '', 1
+            proc = self._proc
+            # Killing adb closes the pipe, so a hung command or a device that
+            # dropped off can't block the job thread in the read below.
+            expired = threading.Event()
+
+            def expire():
+                expired.set()
+                proc.kill()
+
+            watchdog = threading.Timer(timeout, expire)
+            watchdog.daemon = True
+            watchdog.start()
+            lines = []
+            started = False
+            try:
+                for line in proc.stdout:
+                    line = line.rstrip('\r\n')
+                    match = self.END_RE.search(line)
+                    if started and match:
+                        return '\n'.join(lines), int(match.group(1))
+                    if started:
+                        lines.append(line)
+                    elif line == self.BEGIN:
+                        started = True
+            finally:
+                watchdog.cancel()
+            if expired.is_set():
+                logging.warning('adb shell: %r timed out after %s s', command, timeout)
+            # The shell went away (device unplugged or rebooted) or was killed.
+            self.close()
+            return '\n'.join(lines), 1
+
+    def close(self):
+        """Close the session so the adb child exits cleanly."""
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+
+
+ADB_SHELL = AdbShell()
+atexit.register(ADB_SHELL.close)
+
+
+class AdbClient:
+    """Minimal client for the adb server's smart-socket protocol.
+
+    Requests are sent as a four hex digit length followed by the payload and
+    answered with ``OKAY`` or ``FAIL``. The server closes the socket after
+    most host services, so each call opens its own connection; that is still
+    a local TCP round trip instead of starting an adb process.
+    Raises :class:`OSError` when no server is listening.
+    """
+
+    # Largest DATA packet the sync protocol accepts.
+    SYNC_DATA_MAX = 64 * 1024
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 5037, timeout: float = 5):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def _connect(self) -> socket.socket:
+        return socket.create_connection((self.host, self.port), timeout=self.timeout)
+
+    @staticmethod
+    def _recv_exact(sock: socket.socket, size: int) -> bytes:
+        buf = b''
+        while len(buf) < size:
+            chunk = sock.recv(size - len(buf))
+            if not chunk:
+                raise ConnectionError('adb server closed the connection')
+            buf += chunk
+        return buf
+
+    def _request(self, sock: socket.socket, payload: str):
+        data = payload.encode()
+        sock.sendall(b'%04x' % len(data) + data)
+        status = self._recv_exact(sock, 4)
+        if status != b'OKAY':
+            length = int(self._recv_exact(sock, 4), 16)
+            message = self._recv_exact(sock, length).decode(errors='replace')
+            raise RuntimeError(f'adb {payload!r} failed: {message}')
+
+    @staticmethod
+    def _parse_devices(body: bytes) -> List[Tuple[str, str]]:
+        return [
+            tuple(line.split('\t', 1))
+            for line in body.decode().splitlines()
+            if '\t' in line
+        ]
+
+    def devices(self) -> List[Tuple[str, str]]:
+        """Return ``(serial, state)`` for every device the server knows."""
+        with self._connect() as sock:
+            self._request(sock, 'host:devices')
+            length = int(self._recv_exact(sock, 4), 16)
+            return self._parse_devices(self._recv_exact(sock, length))
+
+    def track_devices(self) -> socket.socket:
+        """Open a ``host:track-devices`` stream; read it with :meth:`device_lists`."""
+        sock = self._connect()
+        try:
+            self._request(sock, 'host:track-devices')
+        except BaseException:
+            sock.close()
+            raise
+        # The stream stays quiet until something changes.
+        sock.settimeout(None)
+        return sock
+
+    def device_lists(self, sock: socket.socket) -> Iterator[List[Tuple[str, str]]]:
+        """Yield the device list from a tracking socket each time it changes.
+
+        Raises :class:`ConnectionError` once the server closes the stream.
+        """
+        while True:
+            length = int(self._recv_exact(sock, 4), 16)
+            yield self._parse_devices(self._recv_exact(sock, length))
+
+    def _transport(self, service: str) -> socket.socket:
+        sock = self._connect()
+        try:
+            self._request(sock, 'host:transport-any')
+            self._request(sock, service)
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    def wait_for_device(self, timeout: float) -> bool:
+        """Block until a device is online; return False after ``timeout`` seconds.
+
+        The server acknowledges the request at once and sends a second
+        ``OKAY`` when a device reaches the ``device`` state.
+        """
+        with self._connect() as sock:
+            self._request(sock, 'host:wait-for-any-device')
+            sock.settimeout(timeout)
+            try:
+                return self._recv_exact(sock, 4) == b'OKAY'
+            except socket.timeout:
+                return False
+
+    def reboot(self, mode: str = ''):
+        """Reboot the device, optionally into ``recovery`` or ``bootloader``."""
+        self._transport(f'reboot:{mode}').close()
+
+    def push(self, local, remote: str, mode: int = 0o644):
+        """Copy ``local`` to ``remote`` on the device with the sync protocol.
+
+        The file body goes out with ``socket.sendfile``, which lets the kernel
+        copy it straight from the page cache where ``os.sendfile`` exists.
+        """
+        with self._transport('sync:') as sock, open(local, 'rb') as fh:
+            _advise_sequential(fh)
+            target = f'{remote},{0o100000 | mode}'.encode()
+            sock.sendall(b'SEND' + struct.pack('<I', len(target)) + target)
+            size = os.fstat(fh.fileno()).st_size
+            offset = 0
+            while offset < size:
+                count = min(self.SYNC_DATA_MAX, size - offset)
+                sock.sendall(b'DATA' + struct.pack('<I', count))
+                sock.sendfile(fh, offset, count)
+                offset += count
+            mtime = int(os.fstat(fh.fileno()).st_mtime)
+            sock.sendall(b'DONE' + struct.pack('<I', mtime))
+            status = self._recv_exact(sock, 4)
+            length = struct.unpack('<I', self._recv_exact(sock, 4))[0]
+            if status != b'OKAY':
+                message = self._recv_exact(sock, length).decode(errors='replace')
+                raise RuntimeError(f'adb push to {remote} failed: {message}')
+            sock.sendall(b'QUIT' + struct.pack('<I', 0))
+
+
+ADB_CLIENT = AdbClient()
 
 
 def device_connected() -> bool:
-    """Check if a device is connected via ADB."""
-    result = adb_command(['devices'])
-    lines = result.stdout.strip().splitlines()
-    devices = [l for l in lines[1:] if l.strip()]
-    return len(devices) > 0
+    """Check if a device is connected and authorized via ADB."""
+    # Offline and unauthorized entries can't be talked to, so only count
+    # devices in the ``device`` state.
+    try:
+        return any(state == 'device' for _, state in ADB_CLIENT.devices())
+    except OSError:
+        # No server running yet; the adb binary starts one for us.
+        pass
+    # With one device attached get-state answers with just its state.
+    result = adb_command(['get-state'], text=False)
+    if result.returncode == 0:
+        return result.stdout.strip() == b'device'
+    if b'more than one device' not in result.stderr:
+        return False  # None attached, or unauthorized/offline.
+    # A substring test on the raw bytes, with no decoding or line splitting.
+    out = adb_command(['devices'], text=False).stdout
+    return b'\tdevice\n' in out or b'\tdevice\r\n' in out
+
+
+def start_adb_server() -> bool:
+    """Start the adb server if it isn't running; return whether it is up.
+
+    The server stays up after the flasher exits, like one started by adb.
+    """
+    try:
+        return adb_command(['start-server'], capture=False).returncode == 0
+    except OSError:
+        return False
 
 
-def load_profile() -> Optional[dict]:
-    """Load device profile from configuration file."""
-    if not Path(CONFIG_FILE).exists():
-        return None
-    with open(CONFIG_FILE, 'r') as fh:
-        data = json.load(fh)
-    return data.get('SM-J320FN')
+def open_device_tracker() -> socket.socket:
+    """Return a ``host:track-devices`` stream, starting the server if needed."""
+    try:
+        return ADB_CLIENT.track_devices()
+    except OSError:
+        if not start_adb_server():
+            raise
+    return ADB_CLIENT.track_devices()
 
 
-def download_file(url, dest, text):
-    CACHE_DIR.mkdir(exist_ok=True)
+def _adb_reboot(mode: str):
+    try:
+        ADB_CLIENT.reboot(mode)
+    except (OSError, RuntimeError):
+        adb_command(['reboot', mode], capture=False)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_config(path: str, mtime_ns: int) -> dict:
+    """Parse ``path``; cached per modification time so edits are picked up."""
+    raw = Path(path).read_bytes()
+    return orjson.loads(raw) if orjson else json.loads(raw)
+
+
+def load_profile() -> dict:
+    """Return the SM-J320FN profile with overrides from the config file.
+
+    The built-in profile is used as is when there is no config file.
+    """
+    profile = dict(DEFAULT_PROFILES['SM-J320FN'])
+    try:
+        mtime_ns = os.stat(CONFIG_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return profile
+    profile.update(_load_config(CONFIG_FILE, mtime_ns).get('SM-J320FN', {}))
+    return profile
+
+
+def download_file(url, dest, text, expected_sha256=None, cancel=None):
+    """Download ``url`` to ``dest`` unless a verified copy is already cached.
+
+    The cached copy is kept when its recorded SHA-256 still matches and the
+    server reports the same version, revalidated with a conditional HEAD.
+    ``cancel`` is passed on to ``parallel_download``.
+    """
+    headers = {}
+    validator = _read_sidecar(_validator_file(dest)) if dest.exists() else None
+    if validator:
+        if validator.startswith('"'):
+            headers['If-None-Match'] = validator
+        else:
+            headers['If-Modified-Since'] = validator
+    try:
+        head = _SESSION.head(
+            url, allow_redirects=True, headers=headers, timeout=HTTP_TIMEOUT
+        )
+    except requests.RequestException:
+        # Offline, a cached copy is only good if it still verifies.
+        if _cache_ok(dest, expected_sha256):
+            log(f'{dest} already exists, skipping download (offline)', text)
+            return
+        raise
     if dest.exists():
-        log(f'{dest} already exists, skipping download', text)
-        return
+        if head.status_code == 304 or not head.ok:
+            current = True
+        else:
+            expected = int(head.headers.get('Content-Length', 0))
+            current = validator == _range_validator(head) and (
+                not expected or dest.stat().st_size == expected
+            )
+        if current and _cache_ok(dest, expected_sha256):
+            log(f'{dest} already exists, skipping download', text)
+            return
+        log(f'{dest} is outdated or damaged, downloading it again', text)
+    if head.status_code == 304:
+        head = None
     log(f'Downloading {url}', text)
-    resp = requests.get(url, stream=True)
-    if resp.status_code != 200:
-        raise RuntimeError(f'Failed to download {url}')
-    with open(dest, 'wb') as fh:
-        for chunk in resp.iter_content(chunk_size=8192):
-            fh.write(chunk)
+    parallel_download(url, dest, text, head=head, expected_sha256=expected_sha256,
+                      cancel=cancel)
 
 
 
 
+def wait_for_device(timeout: float = 120):
+    """Block until adb sees a device, raising RuntimeError after ``timeout`` seconds."""
+    try:
+        ready = ADB_CLIENT.wait_for_device(timeout)
+    except (OSError, RuntimeError):
+        ready = None  # No server to ask; the adb binary starts one.
+    if ready is False:
+        raise RuntimeError(f'No device appeared within {timeout:.0f} seconds')
+    if ready:
+        return
+    process = subprocess.Popen(
+        [_adb_executable(), 'wait-for-device'],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+        raise RuntimeError(f'No device appeared within {timeout:.0f} seconds') from None
+
+
+SIDELOAD_PROGRESS_RE = re.compile(rb'(\d{1,3})%')
+
+
 def sideload_zip(zip_path, text):
+    """Sideload ``zip_path`` and report adb's percentage as it goes.
+
+    adb rewrites its ``serving: ... (~N%)`` status with carriage returns, so
+    the output is read in raw chunks and only the latest percentage in each
+    chunk is passed to ``text.set_progress`` when the log target has one.
+    """
     log('Sideloading LineageOS...', text)
-    adb_command(['reboot', 'recovery'])
-    adb_command(['wait-for-device'])
-    subprocess.run([ADB_NAME, 'sideload', zip_path])
+    _adb_reboot('recovery')
+    wait_for_device()
+    set_progress = getattr(text, 'set_progress', None)
+    process = subprocess.Popen(
+        [_adb_executable(), 'sideload', str(zip_path)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        bufsize=0,
+    )
+    tail = collections.deque(maxlen=20)
+    last_percent = -1
+    fd = process.stdout.fileno()
+    while True:
+        data = os.read(fd, 4096)
+        if not data:
+            break
+        tail.append(data)
+        matches = SIDELOAD_PROGRESS_RE.findall(data)
+        if matches and set_progress:
+            percent = min(int(matches[-1]), 100)
+            if percent != last_percent:
+                set_progress(percent)
+                last_percent = percent
+    process.stdout.close()
+    process.wait()
+    if process.returncode != 0:
+        output = b''.join(tail).decode(errors='replace').replace('\r', '\n')
+        message = output.strip().splitlines()[-1] if output.strip() else ''
+        raise RuntimeError(f'adb sideload failed: {message or process.returncode}')
+    if set_progress:
+        set_progress(100)
 
 
 def install_tools(text_widget):
     """Install required tools (ADB and Heimdall) with proper error handling."""
+    # The user may have installed something by hand since the last lookup.
+    check_tool.cache_clear()
+    TOOLS.clear()
     try:
         ensure_adb(text_widget)
         ensure_heimdall(text_widget)
@@ -390,13 +1509,10 @@ def download_rom(text_widget):
     """Download only the LineageOS ROM with improved error handling."""
     try:
         profile = load_profile()
-        if not profile:
-            error_msg = 'Device profile not found in device_config.json'
-            logging.warning(error_msg)
-            log(error_msg, text_widget)
-            return
         rom_zip = CACHE_DIR / Path(profile['rom_url']).name
-        download_file(profile['rom_url'], rom_zip, text_widget)
+        download_file(
+            profile['rom_url'], rom_zip, text_widget, profile.get('rom_sha256')
+        )
         log('ROM download complete.', text_widget)
     except (requests.RequestException, ConnectionError) as exc:
         error_msg = f'Network error during ROM download: {exc}'
@@ -416,8 +1532,21 @@ def download_rom(text_widget):
 
 
 def install_apk(apk, text):
+    """Install ``apk`` on the device; return whether adb reported success."""
     log(f'Installing APK {apk}', text)
-    subprocess.run([ADB_NAME, 'install', apk])
+    result = adb_command(['install', str(apk)])
+    if result.returncode == 0:
+        log('APK installed.', text)
+        return True
+    # Depending on its version adb prints "Failure [INSTALL_FAILED_...]" on
+    # stdout or stderr.
+    lines = f'{result.stdout}\n{result.stderr}'.strip().splitlines()
+    message = lines[-1] if lines else f'adb exited with {result.returncode}'
+    error_msg = f'APK installation failed: {message}'
+    logging.error(error_msg)
+    log(error_msg, text)
+    show_error('Install Failed', error_msg)
+    return False
 
 
 def install_apk_prompt(text_widget):
@@ -437,13 +1566,13 @@ def install_travelbot_apk(text_widget):
 
 def reboot_device(mode, text):
     log(f'Rebooting to {mode}...', text)
-    adb_command(['reboot', mode])
+    _adb_reboot(mode)
 
 
 def reboot_to_recovery(text_widget):
     """Reboot the connected device directly into recovery mode."""
     root_log('Rebooting device to recovery...', text_widget)
-    adb_command(['reboot', 'recovery'])
+    _adb_reboot('recovery')
 
 
 def open_log_file():
@@ -457,12 +1586,16 @@ def open_log_file():
 
 def clear_log(text_widget):
     text_widget.clear()
-    Path(LOG_FILE).write_text('')
+    # Truncate in place; the logging handler keeps appending to the same file.
+    os.close(os.open(LOG_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644))
     log('Log cleared.', text_widget)
 
 
 def open_docs():
     """Open the local HTML documentation in the default browser."""
+    # Only this button needs webbrowser, so don't pay for it at startup.
+    import webbrowser
+
     doc = Path('docs/index.html').resolve()
     webbrowser.open(f'file://{doc}')
 
@@ -479,13 +1612,13 @@ def flash_recovery_only(text_widget):
             log('No device detected via ADB.', text_widget)
             return
         profile = load_profile()
-        if not profile:
-            error_msg = 'Device profile not found in device_config.json'
-            logging.warning(error_msg)
-            log(error_msg, text_widget)
-            return
         recovery_img = CACHE_DIR / Path(profile['recovery_url']).name
-        download_file(profile['recovery_url'], recovery_img, text_widget)
+        download_file(
+            profile['recovery_url'],
+            recovery_img,
+            text_widget,
+            profile.get('recovery_sha256'),
+        )
         show_info(
             'Download Mode',
             'Put the phone in Download Mode (Power+Home+Vol Down) and connect it.'
@@ -511,21 +1644,33 @@ def flash_recovery_only(text_widget):
 
 def flash_process(text_widget, apk_path=None):
     """Main flash process with improved error handling."""
+    cancel = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=2)
     try:
         ensure_adb(text_widget)
         if not device_connected():
             log('No device detected via ADB.', text_widget)
             return
         profile = load_profile()
-        if not profile:
-            error_msg = 'Device profile not found in device_config.json'
-            logging.warning(error_msg)
-            log(error_msg, text_widget)
-            return
         recovery_img = CACHE_DIR / Path(profile['recovery_url']).name
         rom_zip = CACHE_DIR / Path(profile['rom_url']).name
-        download_file(profile['recovery_url'], recovery_img, text_widget)
-        download_file(profile['rom_url'], rom_zip, text_widget)
+        # Both downloads are independent, so fetch them side by side.
+        jobs = [
+            (profile['recovery_url'], recovery_img, profile.get('recovery_sha256')),
+            (profile['rom_url'], rom_zip, profile.get('rom_sha256')),
+        ]
+        futures = {
+            pool.submit(download_file, url, dest, text_widget, sha256, cancel): dest
+            for url, dest, sha256 in jobs
+        }
+        try:
+            for future in as_completed(futures):
+                future.result()
+                log(f'{futures[future].name} ready.', text_widget)
+        except BaseException:
+            # Report the failure now instead of after the other download.
+            cancel.set()
+            raise
         show_info(
             'Download Mode',
             'Put the phone in Download Mode (Power+Home+Vol Down) and connect it.'
@@ -550,62 +1695,135 @@ def flash_process(text_widget, apk_path=None):
         show_error('Error', error_msg)
         logging.error(error_msg)
         log(error_msg, text_widget)
+    finally:
+        # Let a cancelled download stop before its .part is reused.
+        pool.shutdown()
 
 
-def start_flash(text_widget, apk_path, progress):
+# Set while a flash/install job runs so the device poll stays out of its way.
+JOB_RUNNING = threading.Event()
 
-    def run():
-        try:
-            flash_process(text_widget, apk_path)
-        finally:
-            progress.setRange(0, 1)
-            progress.setVisible(False)
 
-    progress.setRange(0, 0)
-    progress.setVisible(True)
-    threading.Thread(target=run, daemon=True).start()
+class FlashWorker(QObject):
+    """Run jobs one at a time on a dedicated QThread, reporting via signals.
 
+    The worker is passed to each job in place of the log box: ``log()`` calls
+    its ``append``, which emits ``log_line`` so the text reaches the widget
+    on the GUI thread instead of being written from the worker thread.
+    Jobs arrive through ``submitted`` and queue up on the thread's event
+    loop, so adb and heimdall never run for two jobs at once.
+    """
 
-def start_flash_recovery(text_widget, progress):
+    log_line = pyqtSignal(str)
+    progress_changed = pyqtSignal(int)
+    started = pyqtSignal()
+    finished = pyqtSignal()
+    submitted = pyqtSignal(object, tuple)
 
-    def run():
+    def __init__(self):
+        super().__init__()
+        self._job_slots = []
+        self.submitted.connect(self.run)
+
+    def append(self, message):
+        self.log_line.emit(message)
+
+    def set_progress(self, percent):
+        self.progress_changed.emit(percent)
+
+    def bind(self, text_widget, progress):
+        """Route the next job's log lines, progress and completion to these widgets."""
+        for signal, slot in self._job_slots:
+            signal.disconnect(slot)
+        queued = Qt.ConnectionType.QueuedConnection
+
+        def show_percent(percent):
+            progress.setRange(0, 100)
+            progress.setValue(percent)
+
+        self._job_slots = [(self.log_line, text_widget.append)]
+        if progress is not None:
+            self._job_slots += [
+                (self.progress_changed, show_percent),
+                (self.finished, progress.hide),
+            ]
+        for signal, slot in self._job_slots:
+            signal.connect(slot, queued)
+
+    @pyqtSlot(object, tuple)
+    def run(self, job, args):
+        self.started.emit()
         try:
-            flash_twrp_gui(text_widget)
+            job(self, *args)
+        except JobCancelled:
+            logging.warning('Job cancelled: the application is quitting')
         finally:
-            progress.setRange(0, 1)
-            progress.setVisible(False)
+            JOB_RUNNING.clear()
+            self.finished.emit()
 
-    progress.setRange(0, 0)
-    progress.setVisible(True)
-    threading.Thread(target=run, daemon=True).start()
 
+_JOB_THREAD = None
+_JOB_WORKER = None
 
-def start_auto_flash(text_widget, progress):
 
-    def run():
-        try:
-            auto_flash_j3(text_widget)
-        finally:
-            progress.setRange(0, 1)
-            progress.setVisible(False)
+def job_worker() -> FlashWorker:
+    """Return the shared worker, starting its thread on first use."""
+    global _JOB_THREAD, _JOB_WORKER
+    if _JOB_WORKER is None:
+        _JOB_THREAD = QThread()
+        _JOB_THREAD.setObjectName('flash')
+        _JOB_WORKER = FlashWorker()
+        _JOB_WORKER.moveToThread(_JOB_THREAD)
+        _JOB_THREAD.start()
+    return _JOB_WORKER
 
-    progress.setRange(0, 0)
-    progress.setVisible(True)
-    threading.Thread(target=run, daemon=True).start()
 
+def stop_job_thread():
+    """Stop the current job at its next dialog and let the job thread exit.
 
-def start_install_tools(text_widget, progress):
+    Once ``SHUTTING_DOWN`` is set a job that reaches a dialog raises
+    ``JobCancelled`` instead of going on without the user's answer. Calls
+    the job already queued for the GUI thread are drained while waiting, so
+    it can't block on the GUI thread that is waiting for it.
+    """
+    SHUTTING_DOWN.set()
+    if _JOB_THREAD is not None:
+        _JOB_THREAD.quit()
+        while not _JOB_THREAD.wait(50):
+            QApplication.processEvents()
 
-    def run():
-        try:
-            install_tools(text_widget)
-        finally:
-            progress.setRange(0, 1)
-            progress.setVisible(False)
 
-    progress.setRange(0, 0)
-    progress.setVisible(True)
-    threading.Thread(target=run, daemon=True).start()
+def _start_job(text_widget, progress, job, *args):
+    """Run ``job(worker, *args)`` on the job thread while showing ``progress``.
+
+    ``progress`` may be ``None`` for tabs without a progress bar.
+    """
+    if JOB_RUNNING.is_set():
+        log('Another operation is still running, please wait.', text_widget)
+        return
+    worker = job_worker()
+    worker.bind(text_widget, progress)
+    JOB_RUNNING.set()
+    if progress is not None:
+        progress.setRange(0, 0)
+        progress.setVisible(True)
+    worker.submitted.emit(job, args)
+
+
+def start_flash(text_widget, apk_path, progress):
+    _start_job(text_widget, progress, flash_process, apk_path)
+
+
+def start_flash_recovery(text_widget, progress):
+    _start_job(text_widget, progress, flash_twrp_gui)
+
+
+def start_auto_flash(text_widget, progress):
+    _start_job(text_widget, progress, auto_flash_j3)
+
+
+def start_install_tools(text_widget, progress):
+    _start_job(text_widget, progress, install_tools)
 
 
 def check_device(text_widget):
@@ -618,18 +1836,15 @@ def check_device(text_widget):
 
 def download_magisk(text_widget):
     """Download Magisk zip if not already present."""
-    DOWNLOADS_DIR.mkdir(exist_ok=True)
-    if MAGISK_ZIP.exists():
+    if _cache_ok(MAGISK_ZIP):
         root_log(f'{MAGISK_ZIP} already exists, skipping download', text_widget)
         return MAGISK_ZIP
     root_log(f'Downloading Magisk from {MAGISK_URL}', text_widget)
-    resp = requests.get(MAGISK_URL, stream=True)
-    if resp.status_code != 200:
+    try:
+        parallel_download(MAGISK_URL, MAGISK_ZIP, text_widget)
+    except RuntimeError:
         show_error('Download Failed', 'Failed to download Magisk')
         return None
-    with open(MAGISK_ZIP, 'wb') as fh:
-        for chunk in resp.iter_content(chunk_size=8192):
-            fh.write(chunk)
     root_log('Magisk download complete.', text_widget)
     return MAGISK_ZIP
 
@@ -645,7 +1860,12 @@ def push_magisk(text_widget):
         return
     dest = '/sdcard/Magisk-v23.0.zip'
     root_log(f'Pushing {magisk} to {dest}', text_widget)
-    adb_command(['push', str(magisk), dest])
+    # The download dropped it from the cache; read it back in ahead of adb.
+    _prefetch(magisk)
+    try:
+        ADB_CLIENT.push(magisk, dest)
+    except (OSError, RuntimeError):
+        adb_command(['push', str(magisk), dest], capture=False)
     show_info(
         'Magisk Klaar',
         (
@@ -659,29 +1879,102 @@ def push_magisk(text_widget):
 
 def check_root_status(text_widget, status_label=None):
     """Check if the connected device has root access."""
+
+    def set_status(text):
+        if status_label:
+            _on_gui_thread(lambda: status_label.setText(text))
+
     ensure_adb(text_widget)
     if not device_connected():
         root_log('No device connected.', text_widget)
-        if status_label:
-            status_label.setText('❌ Geen toestel')
+        set_status('❌ Geen toestel')
         return False
-    result = adb_command(['shell', 'which', 'su'])
-    if result.returncode == 0 and result.stdout.strip():
+    output, returncode = ADB_SHELL.run('which su')
+    if returncode == 0 and output.strip():
         root_log('✅ Root gedetecteerd', text_widget)
-        if status_label:
-            status_label.setText('✅ Root aanwezig')
+        set_status('✅ Root aanwezig')
         return True
     root_log('❌ Geen rootrechten', text_widget)
-    if status_label:
-        status_label.setText('❌ Geen root')
+    set_status('❌ Geen root')
     return False
 
 
 
 
+class LogView(QTextEdit):
+    """Read-only log box that coalesces appends into one insert per tick.
+
+    ``QTextEdit.append`` relayouts and repaints on every call; here messages
+    queue up and are inserted together at most every ``LOG_FLUSH_MS``.
+    """
+
+    LOG_FLUSH_MS = 50
+    MAX_LINES = 5000
+
+    def __init__(self):
+        super().__init__()
+        self.setReadOnly(True)
+        self.document().setMaximumBlockCount(self.MAX_LINES)
+        self._pending = collections.deque(maxlen=self.MAX_LINES)
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(self.LOG_FLUSH_MS)
+        self._flush_timer.timeout.connect(self._flush)
+
+    def append(self, text):
+        self._pending.append(text)
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def clear(self):
+        self._pending.clear()
+        super().clear()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        text = '\n'.join(self._pending)
+        self._pending.clear()
+        cursor = QtGui.QTextCursor(self.document())
+        cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
+        if not self.document().isEmpty():
+            text = '\n' + text
+        cursor.insertText(text)
+        scrollbar = self.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
+
+
+def _is_samsung_usb(device) -> bool:
+    """Return whether a udev USB event may concern the phone.
+
+    Events without a PRODUCT key are let through rather than guessed at.
+    """
+    product = device.properties.get('PRODUCT')
+    return not product or product.split('/')[0] == SAMSUNG_USB_VENDOR
+
+
 class MainWindow(QWidget):
+    # Emitted from a pool thread with the result of the adb probe.
+    device_probed = pyqtSignal(bool)
+    # Emitted from the adb tracking thread with the new connection state.
+    device_tracked = pyqtSignal(bool)
+    tracking_started = pyqtSignal()
+    tracking_ended = pyqtSignal()
+    # Emitted from the udev observer thread when a USB device comes or goes.
+    usb_changed = pyqtSignal()
+
     def __init__(self):
         super().__init__()
+        self._connected = None
+        self._probe_running = False
+        self._probe_again = False
+        self.device_probed.connect(self._apply_device_state)
+        self.device_tracked.connect(self._set_connected)
+        worker = job_worker()
+        worker.started.connect(self._refresh_buttons)
+        worker.finished.connect(self._refresh_buttons)
+        # The device may have rebooted during the job; look again afterwards.
+        worker.finished.connect(self.update_button_states)
         self.setWindowTitle(f'📱 Travelbot Flasher v{__version__}')
         self.setMinimumSize(600, 400)
         self.setStyleSheet('background-color: #E6E6FA;')
@@ -700,20 +1993,112 @@ class MainWindow(QWidget):
         self.init_flasher_tab()
         self.init_root_tab()
 
+        # adb needs a moment to pick up a new device, and one plug-in fires
+        # several USB events, so probe once shortly after the last of them.
+        self._usb_settle = QTimer(self)
+        self._usb_settle.setSingleShot(True)
+        self._usb_settle.setInterval(1000)
+        self._usb_settle.timeout.connect(self.update_button_states)
+        self.usb_changed.connect(self._usb_settle.start)
+
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_button_states)
-        self.timer.start(3000)
+        has_events = self._watch_usb() or IS_WINDOWS
+        self._poll_interval = EVENT_POLL_INTERVAL if has_events else POLL_INTERVAL
+        self.timer.start(self._poll_interval)
+        self._track_devices()
+        self.update_button_states()
+        QThreadPool.globalInstance().start(probe_tools)
+        QThreadPool.globalInstance().start(warm_connections)
+
+    def _track_devices(self):
+        """Follow the adb server's device list so changes arrive as they happen.
+
+        The server pushes the full list over ``host:track-devices`` each time
+        it changes; while the stream runs the poll is only a safety net.
+        """
+        self._track_sock = None
+        self.tracking_started.connect(
+            lambda: self.timer.setInterval(EVENT_POLL_INTERVAL)
+        )
+        self.tracking_ended.connect(
+            lambda: self.timer.setInterval(self._poll_interval)
+        )
+        threading.Thread(
+            target=self._follow_tracker, name='adb-track', daemon=True
+        ).start()
+
+    def _follow_tracker(self):
+        # Runs on the tracking thread and blocks until the server reports.
+        try:
+            sock = open_device_tracker()
+        except (OSError, RuntimeError):
+            return  # No adb at all; the poll keeps its normal interval.
+        self._track_sock = sock
+        self.tracking_started.emit()
+        try:
+            for devices in ADB_CLIENT.device_lists(sock):
+                self.device_tracked.emit(
+                    any(state == 'device' for _, state in devices)
+                )
+        except OSError:
+            pass
+        finally:
+            sock.close()
+            self.tracking_ended.emit()
+
+    def stop_tracking(self):
+        """Stop following the device list before the application exits."""
+        if self._track_sock is not None:
+            try:
+                self._track_sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _watch_usb(self):
+        """Start a udev observer for USB hotplug; return whether it runs."""
+        if pyudev is None:
+            return False
+        try:
+            monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+            # Whole devices only; each interface of a device would fire too.
+            monitor.filter_by('usb', device_type='usb_device')
+            self._usb_observer = pyudev.MonitorObserver(
+                monitor, callback=self._on_usb_event
+            )
+            self._usb_observer.daemon = True
+            self._usb_observer.start()
+        except (OSError, ImportError):
+            return False
+        return True
+
+    def _on_usb_event(self, device):
+        # Runs on the observer thread. Bind/change events don't alter which
+        # devices exist, so only plugging and unplugging trigger a probe.
+        if device.action in ('add', 'remove') and _is_samsung_usb(device):
+            self.usb_changed.emit()
+
+    def nativeEvent(self, event_type, message):
+        # Windows broadcasts WM_DEVICECHANGE to top-level windows on hotplug.
+        if IS_WINDOWS and event_type == b'windows_generic_MSG':
+            from ctypes import wintypes
+
+            msg = wintypes.MSG.from_address(int(message))
+            if msg.message == WM_DEVICECHANGE:
+                self.usb_changed.emit()
+        return super().nativeEvent(event_type, message)
 
     def init_flasher_tab(self):
         tab = QWidget()
         layout = QVBoxLayout(tab)
 
         instructions = QLabel(INSTRUCTION_TEXT)
+        # Plain text skips the rich-text detection AutoText does on each layout.
+        instructions.setTextFormat(Qt.TextFormat.PlainText)
         instructions.setWordWrap(True)
         layout.addWidget(instructions)
 
-        self.log_box = QTextEdit()
-        self.log_box.setReadOnly(True)
+        self.log_box = LogView()
         layout.addWidget(self.log_box, 1)
 
         self.progress = QProgressBar()
@@ -723,7 +2108,9 @@ class MainWindow(QWidget):
         button_row = QHBoxLayout()
 
         self.btn_check_device = QPushButton('Detecteer toestel')
-        self.btn_check_device.clicked.connect(lambda: check_device(self.log_box))
+        self.btn_check_device.clicked.connect(
+            lambda: _start_job(self.log_box, self.progress, check_device)
+        )
         button_row.addWidget(self.btn_check_device)
 
         self.btn_install_tools = QPushButton('Install Tools')
@@ -748,7 +2135,7 @@ class MainWindow(QWidget):
 
         self.btn_install_apk = QPushButton('Install travelbot.apk')
         self.btn_install_apk.clicked.connect(
-            lambda: install_travelbot_apk(self.log_box)
+            lambda: _start_job(self.log_box, self.progress, install_travelbot_apk)
         )
         layout.addWidget(self.btn_install_apk)
 
@@ -779,36 +2166,86 @@ class MainWindow(QWidget):
         layout = QVBoxLayout(tab)
 
         desc = QLabel('Root-toegang is optioneel voor Travelbot, alleen nodig voor diepe systeemtoegang.')
+        desc.setTextFormat(Qt.TextFormat.PlainText)
         desc.setWordWrap(True)
         layout.addWidget(desc)
 
         self.root_status = QLabel('Onbekend')
         layout.addWidget(self.root_status)
 
-        self.root_log = QTextEdit()
-        self.root_log.setReadOnly(True)
+        self.root_log = LogView()
         layout.addWidget(self.root_log, 1)
 
         self.btn_dl_magisk = QPushButton('Download Magisk.zip')
-        self.btn_dl_magisk.clicked.connect(lambda: download_magisk(self.root_log))
+        self.btn_dl_magisk.clicked.connect(
+            lambda: _start_job(self.root_log, None, download_magisk)
+        )
         layout.addWidget(self.btn_dl_magisk)
 
         self.btn_flash_magisk = QPushButton('Zet Magisk.zip op toestel')
-        self.btn_flash_magisk.clicked.connect(lambda: push_magisk(self.root_log))
+        self.btn_flash_magisk.clicked.connect(
+            lambda: _start_job(self.root_log, None, push_magisk)
+        )
         layout.addWidget(self.btn_flash_magisk)
 
         self.btn_reboot_recovery = QPushButton('Reboot naar Recovery')
-        self.btn_reboot_recovery.clicked.connect(lambda: reboot_to_recovery(self.root_log))
+        self.btn_reboot_recovery.clicked.connect(
+            lambda: _start_job(self.root_log, None, reboot_to_recovery)
+        )
         layout.addWidget(self.btn_reboot_recovery)
 
         self.btn_check_root = QPushButton('Check Rootstatus')
-        self.btn_check_root.clicked.connect(lambda: check_root_status(self.root_log, self.root_status))
+        self.btn_check_root.clicked.connect(
+            lambda: _start_job(
+                self.root_log, None, check_root_status, self.root_status
+            )
+        )
         layout.addWidget(self.btn_check_root)
 
         self.root_tab_index = self.tabs.addTab(tab, '🔓 Root')
 
     def update_button_states(self):
-        connected = device_connected()
+        """Probe the device off the GUI thread, one probe at a time."""
+        if JOB_RUNNING.is_set():
+            return
+        if self._probe_running:
+            # Something changed mid-probe; look again once it reports back.
+            self._probe_again = True
+            return
+        self._probe_running = True
+        QThreadPool.globalInstance().start(self._probe_device)
+
+    def _probe_device(self):
+        # Always report back, or _probe_running stays set and polling stops.
+        connected = False
+        try:
+            connected = device_connected()
+        except OSError:
+            pass
+        except Exception:
+            logging.exception('Device probe failed')
+        finally:
+            self.device_probed.emit(connected)
+
+    def _apply_device_state(self, connected):
+        self._probe_running = False
+        if self._probe_again:
+            self._probe_again = False
+            self.update_button_states()
+        self._set_connected(connected)
+
+    def _set_connected(self, connected):
+        if connected == self._connected:
+            return
+        self._connected = connected
+        self._refresh_buttons()
+
+    def _refresh_buttons(self):
+        """Enable the device actions when a device is there and no job runs."""
+        connected = bool(self._connected)
+        enabled = connected and not JOB_RUNNING.is_set()
+        # One repaint for the whole batch instead of one per button.
+        self.setUpdatesEnabled(False)
         for btn in [
             self.btn_flash_twrp,
             self.btn_flash_rom,
@@ -819,19 +2256,29 @@ class MainWindow(QWidget):
             self.btn_flash_magisk,
             self.btn_reboot_recovery,
             self.btn_check_root,
-            self.btn_view_log,
-            self.btn_clear_log,
         ]:
-            btn.setEnabled(connected)
+            btn.setEnabled(enabled)
+        self.btn_view_log.setEnabled(connected)
+        self.btn_clear_log.setEnabled(connected)
+        self.setUpdatesEnabled(True)
 
     def on_tab_changed(self, index):
-        if index == getattr(self, 'root_tab_index', -1):
-            check_root_status(self.root_log, self.root_status)
+        # An automatic check; skip it rather than queue it behind a job.
+        if index == getattr(self, 'root_tab_index', -1) and not JOB_RUNNING.is_set():
+            _start_job(self.root_log, None, check_root_status, self.root_status)
 
 
 def main():
+    # Created once here so the download workers never race on mkdir.
+    CACHE_DIR.mkdir(exist_ok=True)
+    DOWNLOADS_DIR.mkdir(exist_ok=True)
+    global _GUI_CALL
     app = QApplication(sys.argv)
+    _GUI_CALL = _GuiCall()
+    app.aboutToQuit.connect(_SESSION.close)
+    app.aboutToQuit.connect(stop_job_thread)
     window = MainWindow()
+    app.aboutToQuit.connect(window.stop_tracking)
     window.show()
     sys.exit(app.exec())
 
@@ -6,12 +6,18 @@ focusing on non-GUI functions that can be tested without hardware.
 """
 
 import unittest
+import hashlib
+import io
 import json
 import tempfile
+import socket
+import threading
+import time
+import zipfile
 import os
 import sys
 from pathlib import Path
-from unittest.mock import patch, mock_open, MagicMock
+from unittest.mock import patch, MagicMock
 
 # Try to import the functions to test, skip GUI-related tests if PyQt6 not available
 try:
@@ -36,6 +42,8 @@ class TestFlasherCore(unittest.TestCase):
 
     def setUp(self):
         """Set up test fixtures."""
+        flash.check_tool.cache_clear()
+        flash.TOOLS.clear()
         self.test_config = {
             "SM-J320FN": {
                 "device": "j3lte",
@@ -54,34 +62,57 @@ class TestFlasherCore(unittest.TestCase):
         self.assertIsInstance(flash.__author__, str)
         self.assertIsInstance(flash.__description__, str)
 
-    @patch('builtins.open', new_callable=mock_open, read_data='{}')
-    @patch('pathlib.Path.exists')
-    def test_load_profile_empty_config(self, mock_exists, mock_file):
-        """Test loading profile from empty config file."""
-        mock_exists.return_value = True
-        result = flash.load_profile()
-        self.assertIsNone(result)
-
-    @patch('builtins.open', new_callable=mock_open)
-    @patch('pathlib.Path.exists')
-    @patch('json.load')
-    def test_load_profile_valid_config(self, mock_json_load, mock_exists, mock_file):
+    def _write_config(self, tmp, data):
+        config = Path(tmp) / 'device_config.json'
+        config.write_text(json.dumps(data))
+        return str(config)
+
+    def test_load_profile_empty_config(self):
+        """Test that an empty config file falls back to the built-in profile."""
+        with tempfile.TemporaryDirectory() as tmp:
+            with patch('flash.CONFIG_FILE', self._write_config(tmp, {})):
+                result = flash.load_profile()
+        self.assertEqual(result, flash.DEFAULT_PROFILES['SM-J320FN'])
+
+    def test_load_profile_partial_override(self):
+        """Test that the config file only needs the keys it changes."""
+        override = {'SM-J320FN': {'rom_url': 'https://example.com/lineage.zip'}}
+        with tempfile.TemporaryDirectory() as tmp:
+            with patch('flash.CONFIG_FILE', self._write_config(tmp, override)):
+                result = flash.load_profile()
+        self.assertEqual(result['rom_url'], 'https://example.com/lineage.zip')
+        self.assertEqual(result['device'], 'j3lte')
+
+    def test_load_profile_valid_config(self):
         """Test loading profile from valid config file."""
-        mock_exists.return_value = True
-        mock_json_load.return_value = self.test_config
-        
-        result = flash.load_profile()
-        
+        with tempfile.TemporaryDirectory() as tmp:
+            with patch('flash.CONFIG_FILE', self._write_config(tmp, self.test_config)):
+                result = flash.load_profile()
+
         self.assertIsNotNone(result)
         self.assertEqual(result['device'], 'j3lte')
         self.assertEqual(result['recovery_url'], 'https://example.com/twrp.img')
 
-    @patch('pathlib.Path.exists')
-    def test_load_profile_missing_config(self, mock_exists):
+    def test_load_profile_missing_config(self):
         """Test loading profile when config file doesn't exist."""
-        mock_exists.return_value = False
-        result = flash.load_profile()
-        self.assertIsNone(result)
+        with tempfile.TemporaryDirectory() as tmp:
+            with patch('flash.CONFIG_FILE', str(Path(tmp) / 'missing.json')):
+                result = flash.load_profile()
+        self.assertEqual(result, flash.DEFAULT_PROFILES['SM-J320FN'])
+
+    def test_load_profile_cached_until_modified(self):
+        """Test that the config is parsed once and re-read after an edit."""
+        with tempfile.TemporaryDirectory() as tmp:
+            config = self._write_config(tmp, self.test_config)
+            with patch('flash.CONFIG_FILE', config), patch('flash.orjson', None), \
+                    patch('flash.json.loads', wraps=json.loads) as mock_load:
+                flash.load_profile()
+                flash.load_profile()
+                self.assertEqual(mock_load.call_count, 1)
+                stat = os.stat(config)
+                os.utime(config, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+                flash.load_profile()
+                self.assertEqual(mock_load.call_count, 2)
 
     def test_check_tool_existing(self):
         """Test check_tool with existing tool."""
@@ -89,6 +120,13 @@ class TestFlasherCore(unittest.TestCase):
             result = flash.check_tool('adb')
             self.assertEqual(result, '/usr/bin/adb')
 
+    def test_check_tool_is_cached(self):
+        """Test that repeated lookups don't walk PATH again."""
+        with patch('shutil.which', return_value='/usr/bin/adb') as mock_which:
+            flash.check_tool('adb')
+            flash.check_tool('adb')
+        mock_which.assert_called_once_with('adb')
+
     def test_check_tool_missing(self):
         """Test check_tool with missing tool."""
         with patch('shutil.which', return_value=None):
@@ -108,26 +146,517 @@ class TestFlasherCore(unittest.TestCase):
             self.assertEqual(result.stdout, 'List of devices attached\n')
             self.assertEqual(result.returncode, 0)
 
+    @patch('flash.ADB_CLIENT.devices', side_effect=ConnectionRefusedError)
     @patch('flash.adb_command')
-    def test_device_connected_true(self, mock_adb_command):
+    def test_device_connected_true(self, mock_adb_command, mock_devices):
         """Test device_connected when device is connected."""
-        mock_result = MagicMock()
-        mock_result.stdout = 'List of devices attached\ndevice123\tdevice\n'
-        mock_adb_command.return_value = mock_result
-        
+        mock_adb_command.return_value = MagicMock(returncode=0, stdout=b'device\n')
+
         result = flash.device_connected()
         self.assertTrue(result)
+        mock_adb_command.assert_called_once_with(['get-state'], text=False)
 
+    @patch('flash.ADB_CLIENT.devices', side_effect=ConnectionRefusedError)
     @patch('flash.adb_command')
-    def test_device_connected_false(self, mock_adb_command):
+    def test_device_connected_false(self, mock_adb_command, mock_devices):
         """Test device_connected when no device is connected."""
-        mock_result = MagicMock()
-        mock_result.stdout = 'List of devices attached\n'
-        mock_adb_command.return_value = mock_result
-        
+        mock_adb_command.return_value = MagicMock(
+            returncode=1, stdout=b'', stderr=b'error: no devices/emulators found\n')
+
         result = flash.device_connected()
         self.assertFalse(result)
 
+    @patch('flash.ADB_CLIENT.devices', side_effect=ConnectionRefusedError)
+    @patch('flash.adb_command')
+    def test_device_connected_unauthorized(self, mock_adb_command, mock_devices):
+        """Test that unauthorized or offline devices don't count as connected."""
+        mock_adb_command.return_value = MagicMock(
+            returncode=1, stdout=b'', stderr=b'error: device unauthorized.\n')
+        self.assertFalse(flash.device_connected())
+
+    @patch('flash.ADB_CLIENT.devices', side_effect=ConnectionRefusedError)
+    @patch('flash.adb_command')
+    def test_device_connected_several_devices(self, mock_adb_command, mock_devices):
+        """Test that several attached devices fall back to the full list."""
+        mock_adb_command.side_effect = [
+            MagicMock(returncode=1, stdout=b'',
+                      stderr=b'error: more than one device/emulator\n'),
+            MagicMock(stdout=b'List of devices attached\r\n'
+                             b'emulator-5554\toffline\r\ndevice123\tdevice\r\n'),
+        ]
+        self.assertTrue(flash.device_connected())
+        mock_adb_command.assert_called_with(['devices'], text=False)
+
+    def test_adb_client_devices(self):
+        """Test that AdbClient frames host:devices and parses the reply."""
+        ours, server = socket.socketpair()
+        body = b'device123\tdevice\nemulator-5554\toffline\n'
+        server.sendall(b'OKAY' + b'%04x' % len(body) + body)
+        client = flash.AdbClient()
+        with patch.object(client, '_connect', return_value=ours):
+            devices = client.devices()
+        self.assertEqual(server.recv(64), b'000chost:devices')
+        server.close()
+        self.assertEqual(devices, [('device123', 'device'),
+                                   ('emulator-5554', 'offline')])
+
+    def test_adb_client_tracks_device_changes(self):
+        """Test that each framed list on a tracking socket is yielded in turn."""
+        ours, server = socket.socketpair()
+        first, second = b'device123\toffline\n', b'device123\tdevice\n'
+        server.sendall(b'OKAY' + b'%04x' % len(first) + first
+                       + b'%04x' % len(second) + second + b'0000')
+        client = flash.AdbClient()
+        with patch.object(client, '_connect', return_value=ours):
+            sock = client.track_devices()
+        lists = client.device_lists(sock)
+        self.assertEqual(next(lists), [('device123', 'offline')])
+        self.assertEqual(next(lists), [('device123', 'device')])
+        self.assertEqual(next(lists), [])
+        server.close()
+        with self.assertRaises(ConnectionError):
+            next(lists)
+        sock.close()
+
+    def test_adb_client_wait_for_device(self):
+        """Test that the second OKAY means a device came online."""
+        ours, server = socket.socketpair()
+        server.sendall(b'OKAYOKAY')
+        client = flash.AdbClient()
+        with patch.object(client, '_connect', return_value=ours):
+            self.assertTrue(client.wait_for_device(1))
+        self.assertEqual(server.recv(64), b'0018host:wait-for-any-device')
+        server.close()
+
+        ours, server = socket.socketpair()
+        server.sendall(b'OKAY')
+        with patch.object(client, '_connect', return_value=ours):
+            self.assertFalse(client.wait_for_device(0.01))
+        server.close()
+
+    @patch('flash.start_adb_server', return_value=True)
+    def test_device_tracker_starts_missing_server(self, mock_start):
+        """Test that the tracker starts adb's server when none is listening."""
+        sock = MagicMock()
+        with patch.object(flash.ADB_CLIENT, 'track_devices',
+                          side_effect=[ConnectionRefusedError, sock]):
+            self.assertIs(flash.open_device_tracker(), sock)
+        mock_start.assert_called_once()
+
+    def test_adb_client_push_uses_sync_protocol(self):
+        """Test that AdbClient.push frames SEND/DATA/DONE around the file."""
+        ours, server = socket.socketpair()
+        server.sendall(b'OKAY\x00\x00\x00\x00')
+        with tempfile.TemporaryDirectory() as tmp:
+            local = Path(tmp) / 'magisk.zip'
+            local.write_bytes(b'x' * 70000)
+            client = flash.AdbClient()
+            with patch.object(client, '_transport', return_value=ours):
+                client.push(local, '/sdcard/magisk.zip')
+        sent = b''
+        while True:
+            chunk = server.recv(65536)
+            if not chunk:
+                break
+            sent += chunk
+        server.close()
+        target = b'/sdcard/magisk.zip,33188'
+        self.assertTrue(sent.startswith(b'SEND\x18\x00\x00\x00' + target))
+        self.assertIn(b'DATA\x00\x00\x01\x00', sent)
+        self.assertIn(b'DATA\x70\x11\x00\x00', sent)
+        self.assertEqual(sent.count(b'x'), 70000)
+        self.assertTrue(sent.endswith(b'QUIT\x00\x00\x00\x00'))
+
+    @patch('flash.ADB_CLIENT.devices', return_value=[('device123', 'device')])
+    @patch('flash.adb_command')
+    def test_device_connected_uses_adb_server(self, mock_adb_command, mock_devices):
+        """Test that device_connected asks the adb server before spawning adb."""
+        self.assertTrue(flash.device_connected())
+        mock_adb_command.assert_not_called()
+
+    @patch('subprocess.Popen')
+    def test_adb_shell_framing(self, mock_popen):
+        """Test that AdbShell strips prompt noise and returns the exit code."""
+        proc = MagicMock()
+        proc.poll.return_value = None
+        proc.stdout = iter(['shell@j3lte:/ $ echo ...\r\n', '__BEGIN__\r\n',
+                            '/system/xbin/su\r\n', '__END__0\r\n'])
+        mock_popen.return_value = proc
+        shell = flash.AdbShell()
+        with patch('flash.check_tool', return_value='/usr/bin/adb'):
+            output, returncode = shell.run('which su')
+        self.assertEqual(output, '/system/xbin/su')
+        self.assertEqual(returncode, 0)
+        self.assertIn('which su', proc.stdin.write.call_args[0][0])
+
+    @patch('subprocess.Popen')
+    def test_adb_shell_times_out(self, mock_popen):
+        """Test that a command that never answers ends the session."""
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, b'__BEGIN__\n')
+        proc = MagicMock()
+        proc.poll.return_value = None
+        proc.stdout = os.fdopen(read_fd)
+        # Like a real adb child, dying closes its end of the pipe.
+        proc.kill.side_effect = lambda: os.close(write_fd)
+        mock_popen.return_value = proc
+        shell = flash.AdbShell()
+        try:
+            with patch('flash.check_tool', return_value='/usr/bin/adb'):
+                output, returncode = shell.run('sleep 600', timeout=0.1)
+        finally:
+            proc.stdout.close()
+        self.assertEqual((output, returncode), ('', 1))
+        proc.kill.assert_called_once()
+        self.assertIsNone(shell._proc)
+
+    @patch('flash.show_info')
+    @patch('subprocess.Popen')
+    def test_flash_recovery_batches_output(self, mock_popen, mock_info):
+        """Test that heimdall output is logged and shown in one batch."""
+        proc = MagicMock()
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd,
+                 b'Uploading RECOVERY\r\n100%\r\nRECOVERY upload successful\n')
+        os.close(write_fd)
+        proc.stdout = os.fdopen(read_fd, 'rb', buffering=0)
+        proc.returncode = 0
+        mock_popen.return_value = proc
+        widget = MagicMock()
+        with patch('flash.LOG_FLUSH_INTERVAL', 60), self.assertLogs() as logs:
+            self.assertTrue(flash.flash_recovery('twrp.img', widget))
+        self.assertIn('INFO:root:Uploading RECOVERY\n100%\nRECOVERY upload successful',
+                      logs.output)
+        self.assertEqual(widget.append.call_args_list[-1][0][0],
+                         'Uploading RECOVERY\n100%\nRECOVERY upload successful')
+
+    @patch('flash.show_info')
+    @patch('subprocess.Popen')
+    def test_flash_recovery_headless_collects_output(self, mock_popen, mock_info):
+        """Test that without a log box or terminal the output is logged once."""
+        proc = MagicMock()
+        proc.communicate.return_value = (
+            b'Uploading RECOVERY\r\n100%\r\nRECOVERY upload successful\n', None)
+        proc.returncode = 0
+        mock_popen.return_value = proc
+        with patch('flash._HAS_TTY', False), self.assertLogs() as logs:
+            self.assertTrue(flash.flash_recovery('twrp.img'))
+        proc.communicate.assert_called_once()
+        proc.stdout.fileno.assert_not_called()
+        self.assertIn('INFO:root:Uploading RECOVERY\n100%\nRECOVERY upload successful',
+                      logs.output)
+
+    @patch('flash.wait_for_device')
+    @patch('flash._adb_reboot')
+    @patch('subprocess.Popen')
+    def test_sideload_reports_progress(self, mock_popen, mock_reboot, mock_wait):
+        """Test that adb's sideload percentage is passed on as progress."""
+        proc = MagicMock()
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, b"serving: 'rom.zip'  (~12%)    \rserving: 'rom.zip'  (~47%)"
+                           b"    \rserving: 'rom.zip'  (~47%)    \r")
+        os.close(write_fd)
+        proc.stdout = os.fdopen(read_fd, 'rb', buffering=0)
+        proc.returncode = 0
+        mock_popen.return_value = proc
+        worker = MagicMock()
+        with patch('flash.check_tool', return_value='/usr/bin/adb'):
+            flash.sideload_zip('rom.zip', worker)
+        percents = [call[0][0] for call in worker.set_progress.call_args_list]
+        self.assertEqual(percents, [47, 100])
+        self.assertEqual(mock_popen.call_args[0][0][1:], ['sideload', 'rom.zip'])
+
+    @unittest.skipIf(sys.platform == 'win32', 'pipes cannot be selected on Windows')
+    @patch('flash.show_info')
+    @patch('subprocess.Popen')
+    def test_flash_recovery_shows_progress_while_heimdall_is_quiet(
+            self, mock_popen, mock_info):
+        """Test that carriage-return progress shows before heimdall writes again."""
+        proc = MagicMock()
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, b'Uploading RECOVERY\r50%\r')
+        proc.stdout = os.fdopen(read_fd, 'rb', buffering=0)
+        proc.returncode = 0
+        mock_popen.return_value = proc
+        widget = MagicMock()
+        with patch('flash.LOG_FLUSH_INTERVAL', 0.01):
+            thread = threading.Thread(target=flash.flash_recovery,
+                                      args=('twrp.img', widget))
+            thread.start()
+            deadline = time.monotonic() + 2
+            while time.monotonic() < deadline and not any(
+                    '50%' in call[0][0] for call in widget.append.call_args_list):
+                time.sleep(0.01)
+            shown = [call[0][0] for call in widget.append.call_args_list]
+            os.write(write_fd, b'RECOVERY upload successful\n')
+            os.close(write_fd)
+            thread.join(2)
+        self.assertIn('Uploading RECOVERY\n50%', shown)
+
+    @patch('flash.show_error')
+    @patch('subprocess.Popen')
+    def test_flash_recovery_adds_usb_hint(self, mock_popen, mock_error):
+        """Test that a USB protocol failure gets the cable advice appended.
+
+        Without a log box or a terminal the output is collected in one go.
+        """
+        proc = MagicMock()
+        proc.communicate.return_value = (b'ERROR: Protocol initialisation failed!\n',
+                                         None)
+        proc.returncode = 1
+        mock_popen.return_value = proc
+        with patch('flash._HAS_TTY', False), self.assertLogs() as logs:
+            self.assertFalse(flash.flash_recovery('twrp.img'))
+        self.assertIn('INFO:root:ERROR: Protocol initialisation failed!', logs.output)
+        self.assertIn('ModemManager', mock_error.call_args[0][1])
+
+    @patch('flash.show_error')
+    @patch('flash.adb_command')
+    def test_install_apk_reports_failure(self, mock_adb_command, mock_error):
+        """Test that a failed adb install is reported instead of ignored."""
+        mock_adb_command.return_value = MagicMock(
+            returncode=1, stdout='Performing Streamed Install\n',
+            stderr='adb: failed to install travelbot.apk: '
+                   'Failure [INSTALL_FAILED_OLDER_SDK]\n')
+        widget = MagicMock()
+        self.assertFalse(flash.install_apk('travelbot.apk', widget))
+        self.assertIn('INSTALL_FAILED_OLDER_SDK', mock_error.call_args[0][1])
+        self.assertIn('INSTALL_FAILED_OLDER_SDK', widget.append.call_args[0][0])
+
+    @patch('flash.download_file')
+    def test_download_rom_passes_profile_checksum(self, mock_download):
+        """Test that a rom_sha256 in the profile reaches download_file."""
+        profile = dict(self.test_config['SM-J320FN'], rom_sha256='ab' * 32)
+        with patch('flash.load_profile', return_value=profile):
+            flash.download_rom(None)
+        self.assertEqual(mock_download.call_args[0][3], 'ab' * 32)
+
+    @patch('flash.sideload_zip')
+    @patch('flash.flash_recovery')
+    @patch('flash.show_info')
+    @patch('flash.download_file')
+    @patch('flash.device_connected', return_value=True)
+    @patch('flash.ensure_adb')
+    def test_flash_process_downloads_both_files(self, mock_ensure, mock_connected,
+                                                mock_download, mock_info,
+                                                mock_flash, mock_sideload):
+        """Test that flash_process fetches recovery and ROM before flashing."""
+        with patch('flash.load_profile', return_value=self.test_config['SM-J320FN']):
+            flash.flash_process(None)
+        fetched = sorted(call[0][0] for call in mock_download.call_args_list)
+        self.assertEqual(fetched, ['https://example.com/lineage.zip',
+                                   'https://example.com/twrp.img'])
+        # No checksums in the profile, so nothing is pinned.
+        self.assertEqual({call[0][3] for call in mock_download.call_args_list}, {None})
+        mock_flash.assert_called_once()
+        mock_sideload.assert_called_once()
+
+    @patch('subprocess.run')
+    def test_check_heimdall_caches_version(self, mock_run):
+        """Test that `heimdall version` only runs once per session."""
+        mock_run.return_value = MagicMock(returncode=0, stdout='v1.4.2\n')
+        self.assertTrue(flash.check_heimdall())
+        self.assertTrue(flash.check_heimdall())
+        mock_run.assert_called_once()
+        self.assertEqual(flash.TOOLS.heimdall_version, 'v1.4.2')
+
+    def test_ensure_adb_uses_tools_marker(self):
+        """Test that a recorded adb path skips the PATH lookup next time."""
+        with tempfile.TemporaryDirectory() as tmp:
+            marker = Path(tmp) / '.tools_ok'
+            adb = Path(tmp) / 'adb'
+            adb.touch()
+            with patch('flash.TOOLS_MARKER', marker), \
+                    patch('flash.check_tool', return_value=str(adb)) as mock_which:
+                flash.ensure_adb(None)
+                flash.ensure_adb(None)
+                self.assertEqual(mock_which.call_count, 1)
+                self.assertEqual(json.loads(marker.read_text()), {'adb': str(adb)})
+                adb.unlink()
+                flash.TOOLS.clear()  # as in a fresh session
+                with patch('flash.download_platform_tools'):
+                    flash.ensure_adb(None)
+                self.assertEqual(mock_which.call_count, 2)
+
+    def test_concurrent_ensure_adb_downloads_once(self):
+        """Test that two threads needing adb download platform-tools once."""
+        started = threading.Event()
+
+        def slow_download(text):
+            started.set()
+            time.sleep(0.05)
+
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch('flash.TOOLS_MARKER', Path(tmp) / '.tools_ok'), \
+                patch('flash.LOCAL_ADB', Path(tmp) / 'adb'), \
+                patch('flash.check_tool', return_value=None), \
+                patch('flash.download_platform_tools',
+                      side_effect=slow_download) as mock_download:
+            first = threading.Thread(target=flash.ensure_adb, args=(None,))
+            first.start()
+            started.wait(1)
+            flash.ensure_adb(None)
+            first.join()
+        mock_download.assert_called_once()
+
+    def test_dialogs_from_job_thread_go_through_gui_call(self):
+        """Test that a worker thread's dialog is handed to the GUI thread."""
+        bridge = MagicMock()
+        bridge.call.emit.side_effect = lambda box: box.__setitem__(1, box[0]())
+        answers = []
+        with patch('flash._GUI_CALL', bridge), \
+                patch('flash.QMessageBox') as mock_box, \
+                patch.dict('flash._MESSAGE_BOXES', clear=True):
+            box = mock_box.return_value
+            box.isVisible.return_value = False
+            box.standardButton.return_value = mock_box.StandardButton.Yes
+            flash.show_info('Title', 'Direct')
+            flash.show_info('Title', 'Again')
+            self.assertFalse(bridge.call.emit.called)
+            thread = threading.Thread(
+                target=lambda: answers.append(flash.ask_yes_no('Title', 'Sure?')))
+            thread.start()
+            thread.join()
+        bridge.call.emit.assert_called_once()
+        self.assertEqual(answers, [True])
+        # Each kind of dialog is built once and then reused.
+        self.assertEqual(mock_box.call_count, 2)
+        self.assertEqual(box.exec.call_count, 3)
+
+    def test_open_dialog_is_not_reused(self):
+        """Test that a message while the same kind of dialog is open gets its own."""
+        with patch('flash.QMessageBox') as mock_box, \
+                patch.dict('flash._MESSAGE_BOXES', clear=True):
+            help_box, download_box = MagicMock(), MagicMock()
+            mock_box.return_value = download_box
+            help_box.isVisible.return_value = True
+            flash._MESSAGE_BOXES[mock_box.Icon.Information] = help_box
+            flash.show_info('Download Mode', 'Put the phone in Download Mode')
+        help_box.setText.assert_not_called()
+        help_box.exec.assert_not_called()
+        download_box.setText.assert_called_once_with('Put the phone in Download Mode')
+        download_box.exec.assert_called_once()
+
+    def test_no_dialogs_from_job_thread_while_quitting(self):
+        """Test that a job reaching a dialog during shutdown is cancelled."""
+        bridge = MagicMock()
+        raised = []
+
+        def job():
+            try:
+                flash.ask_yes_no('Title', 'Sure?')
+            except flash.JobCancelled:
+                raised.append(True)
+
+        flash.SHUTTING_DOWN.set()
+        try:
+            with patch('flash._GUI_CALL', bridge):
+                thread = threading.Thread(target=job)
+                thread.start()
+                thread.join(1)
+        finally:
+            flash.SHUTTING_DOWN.clear()
+        self.assertFalse(bridge.call.emit.called)
+        self.assertEqual(raised, [True])
+
+    @patch('flash.flash_recovery')
+    @patch('flash.show_error')
+    @patch('flash.download_file')
+    @patch('flash.device_connected', return_value=True)
+    @patch('flash.ensure_adb')
+    def test_flash_process_reports_failed_download_right_away(
+            self, mock_ensure, mock_connected, mock_download, mock_error,
+            mock_flash):
+        """Test that a failed download is reported without waiting for the other."""
+        rom_started = threading.Event()
+        reported = threading.Event()
+        rom_saw = []
+
+        def fake_download(url, dest, text, sha256, cancel):
+            if url.endswith('.img'):
+                rom_started.wait(5)
+                raise RuntimeError('recovery download failed')
+            rom_started.set()
+            reported.wait(5)
+            rom_saw.append(reported.is_set() and cancel.is_set())
+
+        mock_download.side_effect = fake_download
+        mock_error.side_effect = lambda *args: reported.set()
+        with patch('flash.load_profile', return_value=self.test_config['SM-J320FN']):
+            flash.flash_process(None)
+        self.assertIn('recovery download failed', mock_error.call_args[0][1])
+        # The ROM download was still running and had been told to stop.
+        self.assertEqual(rom_saw, [True])
+        mock_flash.assert_not_called()
+
+    @patch('flash.flash_recovery')
+    @patch('flash.download_file')
+    @patch('flash.device_connected', return_value=True)
+    @patch('flash.ensure_adb')
+    @patch('flash.load_profile')
+    def test_flash_process_stops_at_download_mode_prompt_while_quitting(
+            self, mock_profile, mock_adb, mock_connected, mock_download,
+            mock_flash_recovery):
+        """Test that quitting mid-download doesn't flash without the user's go."""
+        mock_profile.return_value = {
+            'recovery_url': 'https://example.com/twrp.img',
+            'rom_url': 'https://example.com/lineage.zip',
+        }
+        raised = []
+
+        def job():
+            try:
+                flash.flash_process(None)
+            except flash.JobCancelled:
+                raised.append(True)
+
+        flash.SHUTTING_DOWN.set()
+        try:
+            with patch('flash._GUI_CALL', MagicMock()):
+                thread = threading.Thread(target=job)
+                thread.start()
+                thread.join(1)
+        finally:
+            flash.SHUTTING_DOWN.clear()
+        self.assertEqual(raised, [True])
+        mock_flash_recovery.assert_not_called()
+
+    @patch('flash.job_worker')
+    def test_start_job_refuses_while_busy(self, mock_worker):
+        """Test that a second click while a job runs doesn't queue more work."""
+        widget = MagicMock()
+        flash.JOB_RUNNING.set()
+        try:
+            flash.start_flash(widget, None, MagicMock())
+        finally:
+            flash.JOB_RUNNING.clear()
+        mock_worker.assert_not_called()
+        widget.append.assert_called_once()
+        flash.start_flash(widget, None, MagicMock())
+        mock_worker.return_value.submitted.emit.assert_called_once_with(
+            flash.flash_process, (None,))
+        flash.JOB_RUNNING.clear()
+
+    def test_clear_log_truncates_file(self):
+        """Test that clearing the log empties the file and the widget."""
+        widget = MagicMock()
+        with tempfile.TemporaryDirectory() as tmp:
+            log_file = Path(tmp) / 'flasher.log'
+            log_file.write_text('old line\n')
+            with patch('flash.LOG_FILE', str(log_file)), patch('flash.logging.info'):
+                flash.clear_log(widget)
+            self.assertEqual(log_file.read_bytes(), b'')
+        widget.clear.assert_called_once()
+
+    @patch('subprocess.Popen')
+    def test_wait_for_device_timeout(self, mock_popen):
+        """Test that a device that never shows up raises instead of hanging."""
+        process = mock_popen.return_value
+        process.wait.side_effect = [flash.subprocess.TimeoutExpired('adb', 1), 0]
+        with self.assertRaises(RuntimeError):
+            flash.wait_for_device(timeout=1)
+        process.kill.assert_called_once()
+
     def test_constants_defined(self):
         """Test that required constants are defined."""
         self.assertTrue(hasattr(flash, 'CONFIG_FILE'))
@@ -148,10 +677,316 @@ class TestFlasherCore(unittest.TestCase):
                 mock_logger.assert_called_once()
 
 
+def _fake_response(status, body=b'', headers=None, url='https://example.com/file'):
+    """Build a minimal stand-in for a streamed ``requests`` response."""
+    resp = MagicMock()
+    resp.status_code = status
+    resp.ok = status < 400
+    resp.headers = headers or {}
+    resp.url = url
+    resp.raw = io.BytesIO(body)
+    resp.__enter__.return_value = resp
+    return resp
+
+
+@unittest.skipUnless(FLASH_AVAILABLE, "Flash module not available")
+class TestDownloads(unittest.TestCase):
+    """Test the HTTP download helpers without touching the network."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dest = Path(self.tmp.name) / 'rom.zip'
+        self.payload = bytes(range(256)) * 64
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _ranged_get(self, url, headers=None, stream=False, timeout=None):
+        self.assertEqual(headers['Accept-Encoding'], 'identity')
+        start, end = headers['Range'][len('bytes='):].split('-')
+        return _fake_response(206, self.payload[int(start):int(end) + 1], headers={
+            'Content-Range': f'bytes {start}-{end}/{len(self.payload)}'})
+
+    def test_warm_connections_ignores_failures(self):
+        """Test that an unreachable host doesn't stop the other warm-ups."""
+        failure = flash.requests.ConnectionError
+        head = MagicMock(side_effect=[failure, MagicMock(), MagicMock()])
+        with patch('flash._SESSION.head', head):
+            flash.warm_connections()
+        self.assertEqual([call[0][0] for call in head.call_args_list],
+                         [flash.PLATFORM_TOOLS_URL, flash.TWRP_URL, flash.MAGISK_URL])
+
+    def test_parallel_download_ranges(self):
+        """Test that ranged parts are stitched back together in order."""
+        head = _fake_response(200, headers={
+            'Content-Length': str(len(self.payload)), 'Accept-Ranges': 'bytes'})
+        with patch('flash._SESSION.head', return_value=head), \
+                patch('flash._SESSION.get', side_effect=self._ranged_get) as mock_get:
+            flash.parallel_download('https://example.com/file', self.dest,
+                                    part_size=len(self.payload) // 3 + 1)
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(self.dest.read_bytes(), self.payload)
+        self.assertFalse(self.dest.with_name('rom.zip.part').exists())
+        self.assertEqual(self.dest.with_name('rom.zip.sha256').read_text().split()[0],
+                         hashlib.sha256(self.payload).hexdigest())
+
+    def test_parallel_download_single_stream_fallback(self):
+        """Test the single-stream path when ranges are not supported."""
+        head = _fake_response(200, headers={'Content-Length': str(len(self.payload))})
+        with patch('flash._SESSION.head', return_value=head), \
+                patch('flash._SESSION.get',
+                      return_value=_fake_response(200, self.payload)) as mock_get:
+            flash.parallel_download('https://example.com/file', self.dest)
+        mock_get.assert_called_once()
+        self.assertEqual(self.dest.read_bytes(), self.payload)
+
+    def test_parallel_download_falls_back_when_ranges_ignored(self):
+        """Test that a 200 reply to a range request falls back to one stream."""
+        head = _fake_response(200, headers={
+            'Content-Length': str(len(self.payload)), 'Accept-Ranges': 'bytes'})
+        with patch('flash._SESSION.head', return_value=head), \
+                patch('flash._SESSION.get',
+                      side_effect=lambda *a, **kw: _fake_response(200, self.payload)):
+            flash.parallel_download('https://example.com/file', self.dest,
+                                    part_size=4096)
+        self.assertEqual(self.dest.read_bytes(), self.payload)
+
+    def test_parallel_download_resumes_partial_file(self):
+        """Test that a shorter .part file is resumed instead of restarted."""
+        part = self.dest.with_name('rom.zip.part')
+        part.write_bytes(self.payload[:1000])
+        head = _fake_response(200, headers={
+            'Content-Length': str(len(self.payload)), 'Accept-Ranges': 'bytes'})
+        with patch('flash._SESSION.head', return_value=head), \
+                patch('flash._SESSION.get', side_effect=self._ranged_get) as mock_get:
+            flash.parallel_download('https://example.com/file', self.dest,
+                                    part_size=7692)
+        first_range = mock_get.call_args_list[0][1]['headers']['Range']
+        self.assertEqual(first_range, 'bytes=1000-8691')
+        self.assertEqual(self.dest.read_bytes(), self.payload)
+
+    def test_parallel_download_restarts_when_remote_changed(self):
+        """Test that a .part from an older remote version is not resumed."""
+        part = self.dest.with_name('rom.zip.part')
+        part.write_bytes(b'x' * 1000)
+        part.with_name('rom.zip.part.etag').write_text('"old"')
+        head = _fake_response(200, headers={
+            'Content-Length': str(len(self.payload)), 'Accept-Ranges': 'bytes',
+            'ETag': '"new"'})
+        with patch('flash._SESSION.head', return_value=head), \
+                patch('flash._SESSION.get', side_effect=self._ranged_get) as mock_get:
+            flash.parallel_download('https://example.com/file', self.dest,
+                                    part_size=len(self.payload))
+        headers = mock_get.call_args[1]['headers']
+        self.assertEqual(headers['Range'], f'bytes=0-{len(self.payload) - 1}')
+        self.assertEqual(headers['If-Range'], '"new"')
+        self.assertEqual(self.dest.read_bytes(), self.payload)
+        self.assertFalse(part.with_name('rom.zip.part.etag').exists())
+
+    def test_parallel_download_keeps_contiguous_head_on_failure(self):
+        """Test that a failed range leaves a resumable .part behind."""
+        head = _fake_response(200, headers={
+            'Content-Length': str(len(self.payload)), 'Accept-Ranges': 'bytes'})
+
+        def flaky_get(url, headers=None, stream=False, timeout=None):
+            if not headers['Range'].startswith('bytes=0-'):
+                return _fake_response(503)
+            return self._ranged_get(url, headers, stream)
+
+        with patch('flash._SESSION.head', return_value=head), \
+                patch('flash._SESSION.get', side_effect=flaky_get):
+            with self.assertRaises(RuntimeError):
+                flash.parallel_download('https://example.com/file', self.dest,
+                                        part_size=len(self.payload) // 4)
+        part = self.dest.with_name('rom.zip.part')
+        self.assertEqual(part.read_bytes(), self.payload[:len(self.payload) // 4])
+        self.assertFalse(self.dest.exists())
+
+    def test_parallel_download_rejects_truncated_range(self):
+        """Test that a 206 body cut short fails instead of leaving a hole."""
+        head = _fake_response(200, headers={
+            'Content-Length': str(len(self.payload)), 'Accept-Ranges': 'bytes'})
+        quarter = len(self.payload) // 4
+
+        def short_get(url, headers=None, stream=False, timeout=None):
+            resp = self._ranged_get(url, headers, stream)
+            if headers['Range'].startswith(f'bytes={quarter}-'):
+                resp.raw = io.BytesIO(resp.raw.read()[:100])
+            return resp
+
+        with patch('flash._SESSION.head', return_value=head), \
+                patch('flash._SESSION.get', side_effect=short_get):
+            with self.assertRaises(RuntimeError):
+                flash.parallel_download('https://example.com/file', self.dest,
+                                        workers=1, part_size=quarter)
+        part = self.dest.with_name('rom.zip.part')
+        self.assertEqual(part.read_bytes(), self.payload[:quarter])
+        self.assertFalse(self.dest.exists())
+        self.assertFalse(self.dest.with_name('rom.zip.sha256').exists())
+
+    def test_parallel_download_rejects_wrong_content_range(self):
+        """Test that a 206 for a different range than requested is refused."""
+        head = _fake_response(200, headers={
+            'Content-Length': str(len(self.payload)), 'Accept-Ranges': 'bytes'})
+        wrong = _fake_response(206, self.payload[:10], headers={
+            'Content-Range': f'bytes 0-9/{len(self.payload)}'})
+        with patch('flash._SESSION.head', return_value=head), \
+                patch('flash._SESSION.get', return_value=wrong):
+            with self.assertRaises(RuntimeError):
+                flash._download_range('https://example.com/file',
+                                      self.dest, 100, 200)
+
+    def test_parallel_download_cancelled(self):
+        """Test that a set cancel event stops the workers taking new ranges."""
+        head = _fake_response(200, headers={
+            'Content-Length': str(len(self.payload)), 'Accept-Ranges': 'bytes'})
+        cancel = threading.Event()
+        cancel.set()
+        with patch('flash._SESSION.head', return_value=head), \
+                patch('flash._SESSION.get', side_effect=self._ranged_get) as mock_get:
+            with self.assertRaises(RuntimeError):
+                flash.parallel_download('https://example.com/file', self.dest,
+                                        part_size=4096, cancel=cancel)
+        mock_get.assert_not_called()
+        self.assertFalse(self.dest.exists())
+
+    def test_parallel_download_verifies_checksum(self):
+        """Test that both download paths check the expected SHA-256."""
+        digest = hashlib.sha256(self.payload).hexdigest()
+        ranged = _fake_response(200, headers={
+            'Content-Length': str(len(self.payload)), 'Accept-Ranges': 'bytes'})
+        with patch('flash._SESSION.head', return_value=ranged), \
+                patch('flash._SESSION.get', side_effect=self._ranged_get):
+            flash.parallel_download('https://example.com/file', self.dest,
+                                    part_size=4096, expected_sha256=digest)
+        self.assertEqual(self.dest.read_bytes(), self.payload)
+
+        self.dest.unlink()
+        plain = _fake_response(200, headers={'Content-Length': str(len(self.payload))})
+        with patch('flash._SESSION.head', return_value=plain), \
+                patch('flash._SESSION.get',
+                      return_value=_fake_response(200, self.payload)):
+            with self.assertRaises(RuntimeError):
+                flash.parallel_download('https://example.com/file', self.dest,
+                                        expected_sha256='0' * 64)
+        self.assertFalse(self.dest.exists())
+        self.assertFalse(self.dest.with_name('rom.zip.part').exists())
+
+    def test_download_stream_trims_preallocation(self):
+        """Test that a preallocated file is cut back to the bytes received."""
+        resp = _fake_response(200, self.payload,
+                              headers={'Content-Length': str(len(self.payload) * 2)})
+        with patch('flash._SESSION.get', return_value=resp):
+            flash._download_stream('https://example.com/file', self.dest)
+        self.assertEqual(self.dest.read_bytes(), self.payload)
+
+    def _write_cached(self, data, etag=None):
+        self.dest.write_bytes(data)
+        self.dest.with_name('rom.zip.sha256').write_text(
+            hashlib.sha256(self.payload).hexdigest())
+        if etag:
+            self.dest.with_name('rom.zip.etag').write_text(etag)
+
+    def test_download_file_skips_complete_file(self):
+        """Test that a verified cached file is not fetched again."""
+        self._write_cached(self.payload)
+        head = _fake_response(200, headers={'Content-Length': str(len(self.payload))})
+        with patch('flash._SESSION.head', return_value=head), \
+                patch('flash.parallel_download') as mock_download:
+            flash.download_file('https://example.com/file', self.dest, None)
+        mock_download.assert_not_called()
+
+    def test_download_file_refetches_truncated_file(self):
+        """Test that a cached file with the wrong size is downloaded again."""
+        self._write_cached(self.payload[:10])
+        head = _fake_response(200, headers={'Content-Length': str(len(self.payload))})
+        with patch('flash._SESSION.head', return_value=head), \
+                patch('flash.parallel_download') as mock_download:
+            flash.download_file('https://example.com/file', self.dest, None)
+        mock_download.assert_called_once()
+
+    def test_download_file_revalidates_with_etag(self):
+        """Test that a 304 to the conditional HEAD keeps the cached file."""
+        self._write_cached(self.payload, etag='"v1"')
+        with patch('flash._SESSION.head',
+                   return_value=_fake_response(304)) as mock_head, \
+                patch('flash.parallel_download') as mock_download:
+            flash.download_file('https://example.com/file', self.dest, None)
+        self.assertEqual(mock_head.call_args[1]['headers'], {'If-None-Match': '"v1"'})
+        mock_download.assert_not_called()
+
+    def test_download_file_refetches_corrupted_file(self):
+        """Test that a cached file failing its checksum is downloaded again."""
+        self._write_cached(self.payload[::-1])
+        head = _fake_response(200, headers={'Content-Length': str(len(self.payload))})
+        with patch('flash._SESSION.head', return_value=head), \
+                patch('flash.parallel_download') as mock_download:
+            flash.download_file('https://example.com/file', self.dest, None)
+        mock_download.assert_called_once()
+
+    def test_download_file_offline_requires_verified_copy(self):
+        """Test that an unverifiable cached file isn't used when offline."""
+        self._write_cached(self.payload)
+        offline = flash.requests.ConnectionError('offline')
+        with patch('flash._SESSION.head', side_effect=offline):
+            flash.download_file('https://example.com/file', self.dest, None)
+            with self.assertRaises(flash.requests.ConnectionError):
+                flash.download_file('https://example.com/file', self.dest, None,
+                                    expected_sha256='0' * 64)
+
+    def test_cache_ok_rehashes_only_after_changes(self):
+        """Test that an unchanged file is trusted on its recorded size and mtime."""
+        self._write_cached(self.payload)
+        with patch('flash._file_sha256', wraps=flash._file_sha256) as mock_hash:
+            self.assertTrue(flash._cache_ok(self.dest))
+            self.assertTrue(flash._cache_ok(self.dest))
+            self.assertEqual(mock_hash.call_count, 1)
+            self.dest.write_bytes(self.payload[:-1])
+            self.assertFalse(flash._cache_ok(self.dest))
+            self.assertEqual(mock_hash.call_count, 2)
+
+    def test_file_sha256_handles_empty_files(self):
+        """Test the mmap-based hash on a normal and an empty file."""
+        self.dest.write_bytes(self.payload)
+        self.assertEqual(flash._file_sha256(self.dest),
+                         hashlib.sha256(self.payload).hexdigest())
+        self.dest.write_bytes(b'')
+        self.assertEqual(flash._file_sha256(self.dest), hashlib.sha256().hexdigest())
+
+    def test_download_platform_tools_in_memory(self):
+        """Test that only the needed platform tools are extracted, in memory."""
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('platform-tools/adb', b'#!adb')
+            zf.writestr('platform-tools/fastboot', b'#!fastboot')
+            zf.writestr('platform-tools/systrace/systrace.py', b'# unused')
+        resp = _fake_response(200, archive.getvalue())
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        try:
+            with patch('flash._SESSION.get', return_value=resp), \
+                    patch('flash.IS_WINDOWS', False):
+                flash.download_platform_tools(None)
+            self.assertEqual(Path('platform-tools/adb').read_bytes(), b'#!adb')
+            self.assertTrue(os.access('platform-tools/fastboot', os.X_OK))
+            self.assertFalse(Path('platform-tools/systrace').exists())
+            self.assertFalse(Path('platform-tools.zip').exists())
+        finally:
+            os.chdir(cwd)
+
+
 @unittest.skipUnless(FLASH_AVAILABLE, "Flash module not available")
 class TestUtilityFunctions(unittest.TestCase):
     """Test utility functions."""
 
+    def test_download_chunk_size_from_environment(self):
+        """Test that only a positive chunk size override is used."""
+        for raw, expected in (('65536', 65536), ('0', 1 << 20), ('1M', 1 << 20)):
+            with patch.dict(os.environ, {'FLASHER_DOWNLOAD_CHUNK_SIZE': raw}), \
+                    patch('logging.warning') as mock_warning:
+                self.assertEqual(flash._download_chunk_size(), expected)
+            self.assertEqual(mock_warning.called, expected != 65536)
+
     def test_log_function_exists(self):
         """Test that log function is defined and callable."""
         self.assertTrue(callable(flash.log))
@@ -161,6 +996,15 @@ class TestUtilityFunctions(unittest.TestCase):
         """Test that setup_logging function is defined."""
         self.assertTrue(callable(flash.setup_logging))
 
+    def test_usb_events_filtered_by_vendor(self):
+        """Test that only Samsung (or unidentified) USB devices trigger a probe."""
+        def device(props):
+            return MagicMock(properties=props)
+
+        self.assertTrue(flash._is_samsung_usb(device({'PRODUCT': '4e8/6860/400'})))
+        self.assertFalse(flash._is_samsung_usb(device({'PRODUCT': '46d/c077/7200'})))
+        self.assertTrue(flash._is_samsung_usb(device({})))
+
 
 class TestBasicFunctionality(unittest.TestCase):
     """Test basic functionality that doesn't require the flash module."""